@@ -2,7 +2,7 @@
 import os
 import streamlit as st
 from datetime import datetime
-from utils.document_manager import DocumentManager
+from utils.document_manager import get_document_manager
 
 # Cargar variables de entorno
 AIML_API_KEY = st.secrets["AIML_API_KEY"]
@@ -16,7 +16,7 @@ st.set_page_config(
 )
 
 # Inicializar el gestor de documentos
-doc_manager = DocumentManager()
+doc_manager = get_document_manager()
 
 st.title("📚 Yachani")
 st.markdown("""
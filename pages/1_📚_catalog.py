@@ -3,7 +3,9 @@ import pysqlite3
 import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 import streamlit as st
-from utils.document_manager import DocumentManager
+from utils.document_manager import get_document_manager
+from utils.file_server import show_download
+from utils.thumbnails import get_thumbnail
 import os
 from datetime import datetime
 import base64
@@ -34,17 +36,43 @@ def format_file_size(size_in_bytes):
         size_in_bytes /= 1024
     return f"{size_in_bytes:.1f} GB"
 
-def create_download_link(file_path: str, link_text: str):
-    """Crea un link de descarga para un archivo."""
-    try:
-        with open(file_path, "rb") as f:
-            bytes_data = f.read()
-        b64 = base64.b64encode(bytes_data).decode()
-        filename = os.path.basename(file_path)
-        mime_type = "application/octet-stream"
-        return f'<a href="data:{mime_type};base64,{b64}" download="{filename}" class="download-link">{link_text}</a>'
-    except Exception:
-        return None
+def facet_label(counts, option):
+    """Agrega el número de documentos a una opción de filtro."""
+    if option in ("Todas", "Todos"):
+        return option
+    return f"{option} ({counts.get(option, 0)} docs)"
+
+PAGE_SIZE = 12
+
+SORT_OPTIONS = {
+    "Más recientes": ("processed_date", True),
+    "Título (A-Z)": ("title", False),
+    "Año de publicación": ("year", True)
+}
+
+def get_page_cursor(state_key, reset_token):
+    """Obtiene el cursor de la página visible; vuelve a la primera si cambia la consulta."""
+    state = st.session_state.setdefault(state_key, {"token": reset_token, "cursors": [None]})
+    if state["token"] != reset_token:
+        state["token"] = reset_token
+        state["cursors"] = [None]
+    return state["cursors"][-1]
+
+def show_pagination(state_key, page):
+    """Muestra los controles de paginación."""
+    state = st.session_state[state_key]
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("← Anterior", key=f"{state_key}_prev", disabled=len(state["cursors"]) <= 1):
+            state["cursors"].pop()
+            st.rerun()
+    with col2:
+        total_pages = max(1, -(-page["total"] // PAGE_SIZE))
+        st.caption(f"Página {len(state['cursors'])} de {total_pages} · {page['total']} documentos")
+    with col3:
+        if st.button("Siguiente →", key=f"{state_key}_next", disabled=not page["next_cursor"]):
+            state["cursors"].append(page["next_cursor"])
+            st.rerun()
 
 def show_document_details(doc, is_full_view=True):
     """Muestra los detalles del documento con manejo seguro de campos."""
@@ -83,7 +111,7 @@ def main():
 
     st.title("📚 Catálogo de Documentos")
 
-    doc_manager = DocumentManager()
+    doc_manager = get_document_manager()
 
     # Layout de dos columnas principales
     col_catalog, col_search = st.columns([2, 1])
@@ -102,26 +130,34 @@ def main():
         
         # Filtros
         categories = doc_manager.categories["categories"]
+        category_counts = doc_manager.get_facet_counts("category")
+        type_counts = doc_manager.get_facet_counts("type")
+        level_counts = doc_manager.get_facet_counts("level")
+        language_counts = doc_manager.get_facet_counts("language")
         selected_category = st.selectbox(
             "Categoría",
-            ["Todas"] + list(categories.keys())
+            ["Todas"] + list(categories.keys()),
+            format_func=lambda option: facet_label(category_counts, option)
         )
         
         selected_type = st.selectbox(
             "Tipo de Documento",
-            ["Todos"] + doc_manager.get_document_types()
+            ["Todos"] + doc_manager.get_document_types(),
+            format_func=lambda option: facet_label(type_counts, option)
         )
         
         selected_level = st.selectbox(
             "Nivel",
-            ["Todos"] + doc_manager.get_difficulty_levels()
+            ["Todos"] + doc_manager.get_difficulty_levels(),
+            format_func=lambda option: facet_label(level_counts, option)
         )
         
         # Filtros adicionales
         with st.expander("🔍 Filtros Avanzados"):
             selected_language = st.selectbox(
                 "Idioma",
-                ["Todos", "Español", "Inglés", "Francés", "Alemán"]
+                ["Todos", "Español", "Inglés", "Francés", "Alemán"],
+                format_func=lambda option: facet_label(language_counts, option)
             )
             
             year_range = st.slider(
@@ -172,20 +208,28 @@ def main():
         tab_all, tab_search = st.tabs(["📚 Biblioteca", "🔍 Resultados"])
         
         with tab_all:
-            all_documents = list(doc_manager.metadata.values())
-            if all_documents:
-                # Ordenar por fecha
-                all_documents.sort(
-                    key=lambda x: get_safe_value(x, 'processed_date', ''),
-                    reverse=True
+            if doc_manager.get_total_documents():
+                col_sort, col_view = st.columns(2)
+                with col_sort:
+                    sort_label = st.selectbox("Ordenar por:", list(SORT_OPTIONS.keys()))
+                sort_key, descending = SORT_OPTIONS[sort_label]
+                
+                cursor = get_page_cursor("library_page", sort_label)
+                page = doc_manager.get_documents_page(
+                    sort_key=sort_key,
+                    page_size=PAGE_SIZE,
+                    cursor=cursor,
+                    descending=descending
                 )
+                all_documents = page["documents"]
                 
                 # Opciones de visualización
-                view_option = st.radio(
-                    "Vista:",
-                    ["Lista", "Grid"],
-                    horizontal=True
-                )
+                with col_view:
+                    view_option = st.radio(
+                        "Vista:",
+                        ["Lista", "Grid"],
+                        horizontal=True
+                    )
                 
                 if view_option == "Grid":
                     # Vista en grid
@@ -194,9 +238,9 @@ def main():
                         with cols[idx % 3]:
                             with st.container():
                                 # Mostrar preview si existe
-                                preview_path = get_safe_value(doc, 'preview_path')
-                                if preview_path and os.path.exists(preview_path):
-                                    st.image(preview_path, use_column_width=True)
+                                thumbnail_path = get_thumbnail(doc, "medium")
+                                if thumbnail_path:
+                                    st.image(thumbnail_path, use_column_width=True)
                                 
                                 st.markdown(f"""
                                 #### 📄 {get_safe_value(doc, 'title')}
@@ -234,18 +278,16 @@ def main():
                                 st.markdown(show_document_details(doc))
                                 
                                 # Agregar link de descarga si existe el archivo
-                                original_path = get_safe_value(doc, 'original_path')
-                                if original_path and os.path.exists(original_path):
-                                    st.markdown(
-                                        create_download_link(original_path, "📥 Descargar documento"),
-                                        unsafe_allow_html=True
-                                    )
+                                show_download(
+                                    doc['hash'], doc.get('original_path'),
+                                    "📥 Descargar documento", f"list_{doc['hash']}"
+                                )
                             
                             with col2:
                                 # Preview
-                                preview_path = get_safe_value(doc, 'preview_path')
-                                if preview_path and os.path.exists(preview_path):
-                                    st.image(preview_path, use_column_width=True)
+                                thumbnail_path = get_thumbnail(doc, "small")
+                                if thumbnail_path:
+                                    st.image(thumbnail_path, use_column_width=True)
                                 
                                 # Selección
                                 is_selected = st.checkbox(
@@ -269,24 +311,43 @@ def main():
                                 - 📄 {get_safe_value(doc, 'pages', '0')} páginas
                                 - 📦 {get_safe_value(doc, 'chunks', '0')} fragmentos
                                 """)
+                
+                show_pagination("library_page", page)
             else:
                 st.info("No hay documentos en el catálogo. Ve a la sección de carga para agregar documentos.")
 
         # Tab de búsqueda
         with tab_search:
+            # La búsqueda activa se guarda al buscar, así la paginación
+            # (que vuelve a ejecutar la página sin el clic) la conserva
             if search_clicked or search_query:
-                filters = {
-                    "category": selected_category,
-                    "type": selected_type,
-                    "level": selected_level,
-                    "language": selected_language if selected_language != "Todos" else None,
-                    "year_range": year_range
+                st.session_state['catalog_search'] = {
+                    "query": search_query,
+                    "filters": {
+                        "category": selected_category,
+                        "type": selected_type,
+                        "level": selected_level,
+                        "language": selected_language if selected_language != "Todos" else None,
+                        "year_range": year_range
+                    }
                 }
+            active_search = st.session_state.get('catalog_search')
+            
+            if active_search:
+                query = active_search["query"]
+                filters = active_search["filters"]
+                result_hashes = doc_manager.search_document_hashes(query, filters)
                 
-                search_results = doc_manager.search_documents(search_query, filters)
+                cursor = get_page_cursor("search_page", repr((query, filters)))
+                page = doc_manager.get_documents_page(
+                    page_size=PAGE_SIZE,
+                    cursor=cursor,
+                    doc_hashes=result_hashes
+                )
+                search_results = page["documents"]
                 
                 if search_results:
-                    st.markdown(f"### 🔍 Resultados ({len(search_results)})")
+                    st.markdown(f"### 🔍 Resultados ({page['total']})")
                     
                     for doc in search_results:
                         with st.expander(f"📄 {get_safe_value(doc, 'title')}", expanded=False):
@@ -296,18 +357,16 @@ def main():
                                 st.markdown(show_document_details(doc, False))
                                 
                                 # Link de descarga
-                                original_path = get_safe_value(doc, 'original_path')
-                                if original_path and os.path.exists(original_path):
-                                    st.markdown(
-                                        create_download_link(original_path, "📥 Descargar"),
-                                        unsafe_allow_html=True
-                                    )
+                                show_download(
+                                    doc['hash'], doc.get('original_path'),
+                                    "📥 Descargar", f"search_{doc['hash']}"
+                                )
                             
                             with col2:
                                 # Preview
-                                preview_path = get_safe_value(doc, 'preview_path')
-                                if preview_path and os.path.exists(preview_path):
-                                    st.image(preview_path, use_column_width=True)
+                                thumbnail_path = get_thumbnail(doc, "small")
+                                if thumbnail_path:
+                                    st.image(thumbnail_path, use_column_width=True)
                                 
                                 # Selección
                                 is_selected = st.checkbox(
@@ -324,6 +383,8 @@ def main():
                                 else:
                                     if 'selected_docs' in st.session_state and doc['hash'] in st.session_state.selected_docs:
                                         st.session_state.selected_docs.remove(doc['hash'])
+                    
+                    show_pagination("search_page", page)
                 else:
                     st.info("No se encontraron documentos que coincidan con los criterios de búsqueda.")
 
@@ -339,11 +400,12 @@ def render_badges(doc):
     </div>
     """
 
-def render_document_card(doc, preview_path=None):
+def render_document_card(doc, thumbnail_size="small"):
     """Renderiza una tarjeta de documento para la vista grid."""
+    thumbnail_path = get_thumbnail(doc, thumbnail_size)
     return f"""
     <div class="document-grid">
-        {'<img src="data:image/png;base64,' + encode_image(preview_path) + '" class="preview-image" />' if preview_path else ''}
+        {'<img src="data:image/jpeg;base64,' + encode_image(thumbnail_path) + '" class="preview-image" />' if thumbnail_path else ''}
         <h4>{get_safe_value(doc, 'title')}</h4>
         {render_badges(doc)}
         <div class="stats-container">
@@ -4,9 +4,9 @@ import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 import os
 import streamlit as st
-from utils.document_manager import DocumentManager
-from langchain_chroma import Chroma
-from langchain_openai.embeddings import OpenAIEmbeddings
+from utils.document_manager import get_document_manager
+from utils.file_storage import read_json, update_json
+from utils.vector_library import build_vectorstores
 import json
 from datetime import datetime
 
@@ -19,9 +19,7 @@ st.set_page_config(
 def load_saved_agents():
     """Cargar agentes guardados del archivo JSON."""
     try:
-        if os.path.exists("data/saved_agents.json"):
-            with open("data/saved_agents.json", "r") as f:
-                return json.load(f)
+        return read_json("data/saved_agents.json", {})
     except Exception as e:
         st.error(f"Error al cargar agentes guardados: {str(e)}")
     return {}
@@ -29,13 +27,11 @@ def load_saved_agents():
 def save_agent(agent_config):
     """Guardar configuración del agente."""
     try:
-        agents = load_saved_agents()
-        
         # Crear ID único para el agente
         agent_id = f"agent_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
         # Guardar información esencial
-        agents[agent_id] = {
+        agent_data = {
             'name': agent_config['name'],
             'role': agent_config['role'],
             'style': agent_config['style'],
@@ -43,13 +39,15 @@ def save_agent(agent_config):
             'temperature': agent_config['temperature'],
             'max_tokens': agent_config['max_tokens'],
             'context_window': agent_config['context_window'],
-            'docs': [{'title': vs['title'], 'hash': vs['hash']} for vs in agent_config['vectorstores']],
+            'docs': agent_config['docs'],
             'created_at': datetime.now().isoformat()
         }
         
-        os.makedirs("data", exist_ok=True)
-        with open("data/saved_agents.json", "w") as f:
-            json.dump(agents, f, indent=2)
+        def add_agent(agents):
+            agents[agent_id] = agent_data
+            return agents
+        
+        update_json("data/saved_agents.json", add_agent, {})
         
         return agent_id
     except Exception as e:
@@ -59,12 +57,15 @@ def save_agent(agent_config):
 def delete_agent(agent_id):
     """Eliminar un agente guardado."""
     try:
-        agents = load_saved_agents()
-        if agent_id in agents:
-            del agents[agent_id]
-            with open("data/saved_agents.json", "w") as f:
-                json.dump(agents, f, indent=2)
-            return True
+        deleted = []
+        
+        def remove_agent(agents):
+            if agents.pop(agent_id, None) is not None:
+                deleted.append(agent_id)
+            return agents
+        
+        update_json("data/saved_agents.json", remove_agent, {})
+        return bool(deleted)
     except Exception as e:
         st.error(f"Error al eliminar el agente: {str(e)}")
     return False
@@ -78,24 +79,12 @@ def load_agent_config(agent_id, doc_manager):
         
         saved_agent = agents[agent_id]
         
-        # Inicializar vectorstores
-        vectorstores = []
-        for doc_info in saved_agent['docs']:
-            doc = doc_manager.get_document(doc_info['hash'])
-            if doc and os.path.exists(doc.get('vectorstore_path', '')):
-                vectorstore = Chroma(
-                    persist_directory=doc['vectorstore_path'],
-                    embedding_function=OpenAIEmbeddings()
-                )
-                
-                vectorstores.append({
-                    'hash': doc['hash'],
-                    'title': doc['title'],
-                    'vectorstore': vectorstore,
-                    'retriever': vectorstore.as_retriever(
-                        search_kwargs={"k": saved_agent['context_window']}
-                    )
-                })
+        # Inicializar vectorstores (una sola entrada si están en la
+        # colección compartida)
+        vectorstores = build_vectorstores(
+            [doc_manager.get_document(doc_info['hash']) for doc_info in saved_agent['docs']],
+            saved_agent['context_window']
+        )
         
         # Reconstruir configuración completa
         return {
@@ -111,7 +100,7 @@ def main():
     st.title("🤖 Gestión de Asistentes")
     
     # Inicializar doc_manager
-    doc_manager = DocumentManager()
+    doc_manager = get_document_manager()
 
     # Tabs principales
     tab_saved, tab_create = st.tabs(["📚 Asistentes Guardados", "✨ Crear Nuevo Asistente"])
@@ -279,25 +268,10 @@ def main():
             with st.spinner("⚙️ Configurando tu asistente..."):
                 try:
                     # Inicializar vectorstores
-                    vectorstores = []
                     for doc in selected_docs_info:
-                        vectorstore_path = doc.get('vectorstore_path')
-                        if vectorstore_path and os.path.exists(vectorstore_path):
-                            vectorstore = Chroma(
-                                persist_directory=vectorstore_path,
-                                embedding_function=OpenAIEmbeddings()
-                            )
-                            
-                            vectorstores.append({
-                                'hash': doc['hash'],
-                                'title': doc['title'],
-                                'vectorstore': vectorstore,
-                                'retriever': vectorstore.as_retriever(
-                                    search_kwargs={"k": context_window}
-                                )
-                            })
-                        else:
+                        if not os.path.exists(doc.get('vectorstore_path') or ''):
                             st.warning(f"⚠️ No se encontró el vectorstore para {doc['title']}")
+                    vectorstores = build_vectorstores(selected_docs_info, context_window)
 
                     if vectorstores:
                         # Crear configuración
@@ -309,6 +283,11 @@ def main():
                             'temperature': temperature,
                             'max_tokens': max_tokens,
                             'context_window': context_window,
+                            'docs': [
+                                {'title': doc['title'], 'hash': doc['hash']}
+                                for doc in selected_docs_info
+                                if os.path.exists(doc.get('vectorstore_path') or '')
+                            ],
                             'vectorstores': vectorstores
                         }
                         
@@ -321,7 +300,7 @@ def main():
                             
                             st.success(f"""
                             ✅ Asistente "{agent_name}" creado y guardado exitosamente:
-                            - 📚 {len(vectorstores)} documentos base cargados
+                            - 📚 {len(agent_config['docs'])} documentos base cargados
                             - 🎭 Rol: {agent_role}
                             - 💬 Estilo: {communication_style}
                             """)
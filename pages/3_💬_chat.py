@@ -7,6 +7,8 @@ import json
 import os
 from datetime import datetime
 from typing import List, Dict
+from utils.file_storage import atomic_write_json, read_json
+from utils.retrieval import format_results, format_timings, search_vectorstores
 
 class AimlApiChat:
     def __init__(self, api_key: str, base_url: str = "https://api.aimlapi.com"):
@@ -204,15 +206,14 @@ def main():
                                     if tool_call["function"]["name"] == "search_documents":
                                         # Ejecutar búsqueda real en los documentos
                                         query = json.loads(tool_call["function"]["arguments"])["query"]
-                                        results = []
-                                        
-                                        for vs in config['vectorstores']:
-                                            docs = vs['retriever'].get_relevant_documents(query)
-                                            for doc in docs:
-                                                content = doc.page_content.strip()
-                                                source = vs['title']
-                                                if content not in [r.split(']:')[1].strip() for r in results]:
-                                                    results.append(f"[{source}]: {content}")
+                                        # Búsqueda en paralelo en todos los vectorstores con
+                                        # top-k global por puntuación
+                                        search = search_vectorstores(
+                                            config['vectorstores'], query, config['context_window']
+                                        )
+                                        with st.expander("⏱️ Tiempos de búsqueda"):
+                                            st.text("\n".join(format_timings(search)))
+                                        results = format_results(search['results'])
 
                                         # Agregar resultados como mensaje del asistente
                                         api_messages.append({
@@ -258,17 +259,12 @@ def main():
 def load_agent_history(agent_id: str) -> List[Dict]:
     """Carga el historial de conversaciones de un agente específico."""
     history_path = os.path.join("data", "chat_history", f"{agent_id}.json")
-    if os.path.exists(history_path):
-        with open(history_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+    return read_json(history_path, [])
 
 def save_agent_history(agent_id: str, messages: List[Dict]):
     """Guarda el historial de conversaciones de un agente."""
-    os.makedirs(os.path.join("data", "chat_history"), exist_ok=True)
     history_path = os.path.join("data", "chat_history", f"{agent_id}.json")
-    with open(history_path, 'w', encoding='utf-8') as f:
-        json.dump(messages, f, ensure_ascii=False, indent=2)
+    atomic_write_json(history_path, messages)
 
 def format_timestamp(timestamp: str) -> str:
     """Formatea un timestamp para mostrar."""
@@ -7,6 +7,9 @@ import json
 import os
 from datetime import datetime
 from typing import List, Dict
+from utils.file_storage import atomic_write_json, read_json
+from utils.retrieval import format_results, format_timings, search_vectorstores
+from utils.document_manager import get_document_manager
 import base64
 import fitz  # PyMuPDF
 
@@ -68,17 +71,12 @@ def search_documents_tool():
 def load_agent_history(agent_id: str) -> List[Dict]:
     """Carga el historial de conversaciones de un agente específico."""
     history_path = os.path.join("data", "chat_history", f"{agent_id}.json")
-    if os.path.exists(history_path):
-        with open(history_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+    return read_json(history_path, [])
 
 def save_agent_history(agent_id: str, messages: List[Dict]):
     """Guarda el historial de conversaciones de un agente."""
-    os.makedirs(os.path.join("data", "chat_history"), exist_ok=True)
     history_path = os.path.join("data", "chat_history", f"{agent_id}.json")
-    with open(history_path, 'w', encoding='utf-8') as f:
-        json.dump(messages, f, ensure_ascii=False, indent=2)
+    atomic_write_json(history_path, messages)
 
 def format_timestamp(timestamp: str) -> str:
     """Formatea un timestamp para mostrar."""
@@ -234,15 +232,15 @@ def get_document_info(vectorstores: List[Dict]) -> List[Dict]:
     agent_name = vectorstores[0]['title']
     docs_info = []
     
-    agent_dir = os.path.join('data/processed_docs', agent_name)
-    
-    if os.path.exists(agent_dir):
-        pdf_files = [f for f in os.listdir(agent_dir) if f.endswith('.pdf')]
-        
-        for pdf_file in pdf_files:
-            pdf_path = os.path.join(agent_dir, pdf_file)
+    # Los directorios de documentos están direccionados por contenido,
+    # así que la ruta del original se toma de los metadatos
+    doc_manager = get_document_manager()
+    for vs in vectorstores:
+        doc = doc_manager.get_document(vs['hash'])
+        pdf_path = doc.get('original_path', '') if doc else ''
+        if pdf_path.lower().endswith('.pdf') and os.path.exists(pdf_path):
             docs_info.append({
-                'title': os.path.splitext(pdf_file)[0],
+                'title': doc['title'],
                 'path': pdf_path,
                 'agent_name': agent_name
             })
@@ -280,7 +278,7 @@ def main():
     with doc_col:
         st.markdown("### 📄 Material de Estudio")
         try:
-            docs_info = get_document_info(config['vectorstores'])
+            docs_info = get_document_info(config.get('docs') or config['vectorstores'])
             if docs_info:
                 st.markdown(f"**🤖 Agente:** {docs_info[0]['agent_name']}")
                 selected_doc = st.selectbox(
@@ -382,15 +380,14 @@ def main():
                                     if tool_call["function"]["name"] == "search_documents":
                                         # Ejecutar búsqueda
                                         query = json.loads(tool_call["function"]["arguments"])["query"]
-                                        results = []
-                                        
-                                        for vs in config['vectorstores']:
-                                            docs = vs['retriever'].get_relevant_documents(query)
-                                            for doc in docs:
-                                                content = doc.page_content.strip()
-                                                source = vs['title']
-                                                if content not in [r.split(']:')[1].strip() for r in results]:
-                                                    results.append(f"[{source}]: {content}")
+                                        # Búsqueda en paralelo en todos los vectorstores con
+                                        # top-k global por puntuación
+                                        search = search_vectorstores(
+                                            config['vectorstores'], query, config['context_window']
+                                        )
+                                        with st.expander("⏱️ Tiempos de búsqueda"):
+                                            st.text("\n".join(format_timings(search)))
+                                        results = format_results(search['results'])
 
                                         # Agregar resultados de búsqueda como mensaje de función
                                         search_results = "\n\n".join(results[:config['context_window']])
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from utils.dedup import BoilerplateDetector, empty_dedup_stats, strip_boilerplate
+
+
+TOPICS = ["listas", "tuplas", "clases", "bucles", "archivos",
+          "módulos", "errores", "pruebas", "cadenas", "funciones"]
+
+
+def code_page(number: int) -> str:
+    return "\n".join([
+        "Curso de Python - Capítulo 3",
+        f"Ejemplo de {TOPICS[number - 1]}",
+        "for i in range(10):",
+        "    print(i)",
+        "}",
+        f"El bucle del ejemplo {number} recorre los números.",
+        "}",
+        "print(i)",
+        "Fin del ejemplo",
+        f"Página {number}"
+    ])
+
+
+def test_repeated_body_lines_survive():
+    pages = [SimpleNamespace(page_content=code_page(n)) for n in range(1, 11)]
+    stats = empty_dedup_stats()
+
+    cleaned = [page.page_content for page in strip_boilerplate(pages, stats)]
+
+    for number, text in enumerate(cleaned, start=1):
+        lines = text.splitlines()
+        assert "Curso de Python - Capítulo 3" not in lines
+        assert f"Página {number}" not in lines
+        assert "for i in range(10):" in lines
+        assert "    print(i)" in lines
+        assert lines.count("}") == 2
+        assert "print(i)" in lines
+        assert "Fin del ejemplo" not in lines
+    assert stats["boilerplate_lines"] == 3 * len(pages)
+
+
+def test_short_symbol_lines_are_never_boilerplate():
+    detector = BoilerplateDetector()
+    topics = ["listas", "tuplas", "clases", "bucles", "archivos", "módulos", "errores", "pruebas"]
+    detector.learn([f"}}\nTema: {topic}\n}}" for topic in topics])
+
+    assert detector.lines == set()
+    assert detector.strip("}\nTexto\n}") == ("}\nTexto\n}", 0)
@@ -0,0 +1,30 @@
+from utils.document_manager import DocumentManager
+
+
+METADATA = {"title": "Historia Inca", "author": "Ana", "year": 2020, "category": "historia"}
+
+
+def test_same_file_is_registered_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = DocumentManager()
+    metadata = {**METADATA, "content_hash": "a" * 64}
+
+    first = manager.add_document(metadata, "vs_a", "original_a.pdf")
+    second = manager.add_document(metadata, "vs_a", "original_a.pdf")
+
+    assert first == second
+    assert len(manager.metadata) == 1
+    assert manager.categories["category_counts"] == {"historia": 1}
+
+
+def test_other_file_with_same_title_gets_its_own_key(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = DocumentManager()
+
+    first = manager.add_document({**METADATA, "content_hash": "a" * 64}, "vs_a", "original_a.pdf")
+    second = manager.add_document({**METADATA, "content_hash": "b" * 64}, "vs_b", "original_b.pdf")
+
+    assert first != second
+    assert manager.metadata[first]["vectorstore_path"] == "vs_a"
+    assert manager.metadata[second]["vectorstore_path"] == "vs_b"
+    assert manager.categories["category_counts"] == {"historia": 2}
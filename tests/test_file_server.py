@@ -0,0 +1,21 @@
+import pytest
+
+from utils.file_server import parse_range
+
+
+def test_single_ranges():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+
+
+def test_multiple_ranges_are_ignored():
+    assert parse_range("bytes=0-0,5-6", 100) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=-0", "bytes=100-", "bytes=9-3", "items=0-1", "bytes=-"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 100)
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+from utils.lexical_index import LexicalIndex, exact_terms, is_lexical_query, lexical_search
+
+
+def build_index(directory, texts):
+    index = LexicalIndex(str(directory))
+    index.add(
+        [SimpleNamespace(page_content=text, metadata={}) for text in texts],
+        [str(number) for number in range(len(texts))]
+    )
+    return [{"path": str(directory), "title": "Apuntes"}]
+
+
+def test_ordinary_text_is_not_code_like():
+    for query in ["precio en eBay", "mi iPhone", "a.b", "x = 5 en los incas", "e.g. los incas"]:
+        assert not is_lexical_query(query)
+    for query in ["numpy.linspace()", "getElementById", "mi_variable", "a^2", "std::vector"]:
+        assert is_lexical_query(query)
+
+
+def test_exact_terms_are_normalized():
+    assert exact_terms('"Imperio Inca" y np.dot(a, b)') == ["imperio inca", "np dot"]
+
+
+def test_exact_search_requires_code_terms(tmp_path):
+    indexes = build_index(tmp_path, [
+        "Como se organizaba el imperio",
+        "Se usa numpy.linspace(0, 1, 5) para crear la malla"
+    ])
+
+    hits = lexical_search(indexes, "como usar numpy.linspace()", 5, exact=True)
+    assert [hit["content"] for hit in hits] == ["Se usa numpy.linspace(0, 1, 5) para crear la malla"]
+
+    assert lexical_search(indexes, "como usar scipy.integrate()", 5, exact=True) == []
+    assert lexical_search(indexes, "como usar scipy.integrate()", 5)
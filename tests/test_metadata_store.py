@@ -0,0 +1,182 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from utils.document_manager import DocumentManager
+from utils.metadata_store import SqliteMetadataStore
+
+
+DOCUMENTS = [
+    {"title": "Álgebra lineal", "author": "Ana", "year": 2019, "category": "Matemáticas",
+     "type": "Libro de Texto", "level": "Intermedio", "language": "Español",
+     "tags": ["matrices"], "content_hash": "a" * 64},
+    {"title": "Cálculo diferencial", "author": "Luis", "year": 2021, "category": "Matemáticas",
+     "type": "Apuntes", "level": "Principiante", "language": "Español",
+     "tags": ["derivadas"], "content_hash": "b" * 64},
+    {"title": "Historia de los incas", "author": "Rosa", "year": 2015, "category": "Historia",
+     "type": "Libro de Texto", "level": "Avanzado", "language": "Inglés",
+     "tags": ["tahuantinsuyo"], "content_hash": "c" * 64},
+    {"title": "Python para todos", "author": "Ana", "year": 2023, "category": "Programación",
+     "type": "Tutorial", "level": "Principiante", "language": "Español",
+     "tags": ["mi_variable"], "content_hash": "d" * 64},
+]
+
+
+def build_manager(storage):
+    manager = DocumentManager(storage=storage)
+    for number, doc in enumerate(DOCUMENTS):
+        manager.add_document(doc, f"vs_{number}", f"original_{number}.pdf")
+    return manager
+
+
+def titles(documents):
+    return [doc["title"] for doc in documents]
+
+
+def all_pages(manager, **kwargs):
+    pages, cursor = [], None
+    while True:
+        page = manager.get_documents_page(page_size=1, cursor=cursor, **kwargs)
+        pages.extend(titles(page["documents"]))
+        cursor = page["next_cursor"]
+        if not cursor:
+            return pages
+
+
+@pytest.fixture
+def managers(tmp_path, monkeypatch):
+    (tmp_path / "json").mkdir()
+    (tmp_path / "sqlite").mkdir()
+    monkeypatch.chdir(tmp_path / "json")
+    json_manager = build_manager("json")
+    monkeypatch.chdir(tmp_path / "sqlite")
+    sqlite_manager = build_manager("sqlite")
+    return json_manager, sqlite_manager
+
+
+def test_sqlite_manager_does_not_load_the_library(managers):
+    _, sqlite_manager = managers
+    assert sqlite_manager.metadata == {}
+    assert sqlite_manager.get_total_documents() == len(DOCUMENTS)
+
+
+@pytest.mark.parametrize("query, filters", [
+    ("alge", None),
+    ("ana", None),
+    ("mi_var", None),
+    (None, {"category": "Matemáticas"}),
+    (None, {"category": "Todas", "year_range": (2016, 2022)}),
+    ("cal", {"level": "Principiante", "language": "Español"}),
+    ("inexistente", None),
+    (None, None)
+])
+def test_sqlite_search_matches_in_memory_search(managers, query, filters):
+    json_manager, sqlite_manager = managers
+    json_hashes = json_manager.search_document_hashes(query, filters)
+    assert sqlite_manager.search_document_hashes(query, filters) == json_hashes
+    assert sorted(titles(sqlite_manager.search_documents(query, filters))) == \
+        sorted(titles(json_manager.search_documents(query, filters)))
+
+
+@pytest.mark.parametrize("sort_key, descending", [
+    ("processed_date", True), ("title", False), ("year", True), ("year", False)
+])
+def test_sqlite_pages_match_in_memory_pages(managers, sort_key, descending):
+    json_manager, sqlite_manager = managers
+    expected = all_pages(json_manager, sort_key=sort_key, descending=descending)
+    assert len(expected) == len(DOCUMENTS)
+    assert all_pages(sqlite_manager, sort_key=sort_key, descending=descending) == expected
+
+    subset = json_manager.search_document_hashes(None, {"language": "Español"})
+    assert all_pages(sqlite_manager, sort_key=sort_key, descending=descending, doc_hashes=subset) == \
+        all_pages(json_manager, sort_key=sort_key, descending=descending, doc_hashes=subset)
+
+
+def test_sqlite_counts_and_lookups(managers):
+    json_manager, sqlite_manager = managers
+    for field in ("category", "type", "level", "language", "year"):
+        assert sqlite_manager.get_facet_counts(field) == json_manager.get_facet_counts(field)
+    assert sqlite_manager.find_by_content_hash("c" * 64)["title"] == "Historia de los incas"
+    assert titles(sqlite_manager.get_documents_by_category("Historia")) == ["Historia de los incas"]
+    assert len(list(sqlite_manager.iter_documents())) == len(DOCUMENTS)
+
+
+def test_columns_are_added_to_databases_without_them(tmp_path):
+    db_file = str(tmp_path / "metadata.sqlite3")
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE documents (hash TEXT PRIMARY KEY, data TEXT NOT NULL)")
+    conn.execute("INSERT INTO documents VALUES (?, ?)", ("h1", json.dumps(DOCUMENTS[2])))
+    conn.commit()
+    conn.close()
+
+    store = SqliteMetadataStore(db_file, str(tmp_path / ".library_version"))
+
+    assert store.search_hashes("tahuan", {"category": "Historia"}) == {"h1"}
+    assert store.facet_counts("year") == {2015: 1}
+
+
+def test_journal_is_replayed_and_compacted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = build_manager("journal")
+    store = manager.store
+    doc_hash = next(iter(manager.metadata))
+    manager.update_document(doc_hash, {"title": "Álgebra abstracta"})
+
+    # Nada se ha escrito aún en los snapshots
+    assert not (tmp_path / "data" / "metadata.json").exists()
+    assert (tmp_path / "data" / "metadata.journal.jsonl").exists()
+    assert (tmp_path / "data" / "categories.journal.jsonl").exists()
+
+    reloaded = DocumentManager(storage="journal")
+    assert reloaded.metadata == manager.metadata
+    assert reloaded.metadata[doc_hash]["title"] == "Álgebra abstracta"
+    assert reloaded.categories["category_counts"] == {
+        "Matemáticas": 2, "Historia": 1, "Programación": 1
+    }
+
+    store.compact()
+    assert not (tmp_path / "data" / "metadata.journal.jsonl").exists()
+    assert not (tmp_path / "data" / "categories.journal.jsonl").exists()
+    snapshot = json.loads((tmp_path / "data" / "metadata.json").read_text())
+    assert snapshot == manager.metadata
+
+    compacted = DocumentManager(storage="journal")
+    assert compacted.metadata == manager.metadata
+    assert compacted.categories["category_counts"] == reloaded.categories["category_counts"]
+    assert compacted.get_ingestion_stats() == reloaded.get_ingestion_stats()
+
+
+def test_journal_skips_a_truncated_last_line(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = build_manager("journal")
+    with open(manager.store.JOURNAL_FILE, "a", encoding="utf-8") as f:
+        f.write('{"op": "put", "hash": "roto"')
+
+    reloaded = DocumentManager(storage="journal")
+    assert reloaded.metadata == manager.metadata
+    reloaded.add_document({**DOCUMENTS[0], "content_hash": "e" * 64}, "vs_e", "original_e.pdf")
+    assert len(DocumentManager(storage="journal").metadata) == len(DOCUMENTS) + 1
+
+
+def test_counter_batch_is_not_folded_twice(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = build_manager("journal")
+    store = manager.store
+    expected = DocumentManager(storage="journal").categories["category_counts"]
+
+    # Caída tras escribir el snapshot y antes de borrar el lote incorporado
+    store.compact_categories()
+    manager.add_document({**DOCUMENTS[2], "content_hash": "e" * 64}, "vs_e", "original_e.pdf")
+    expected = {**expected, "Historia": expected["Historia"] + 1}
+    os.replace(store.COUNTER_FILE, store.FOLDING_FILE)
+    categories = store.load_categories()
+    categories[store.FOLDED_KEY] = store._read_entries(store.FOLDING_FILE)[0]["id"]
+    with open(store.CATEGORIES_FILE, "w", encoding="utf-8") as f:
+        json.dump(categories, f)
+
+    assert store.load_categories()["category_counts"] == expected
+    store.compact_categories()
+    assert not os.path.exists(store.FOLDING_FILE)
+    assert store.load_categories()["category_counts"] == expected
@@ -0,0 +1,147 @@
+from utils.search_index import FacetIndex, InvertedIndex, SortedIndex
+
+
+DOCUMENTS = {
+    "a": {"title": "Álgebra lineal", "author": "Ana", "tags": ["matrices"]},
+    "b": {"title": "Cálculo diferencial", "author": "Luis", "description": "Límites y derivadas"},
+    "c": {"title": "Historia de los incas", "author": "Rosa", "tags": ["Tahuantinsuyo"]},
+}
+
+BOOKS = {
+    "a": {"category": "Matemáticas", "type": "Libro", "language": "Español", "year": 2019},
+    "b": {"category": "Matemáticas", "type": "Apuntes", "language": "Español", "year": "2021"},
+    "c": {"category": "Historia", "type": "Libro", "language": "Inglés", "year": 2015},
+    "d": {"category": "Matemáticas", "type": "Libro", "language": "Inglés", "year": 2021},
+    "e": {"category": "Historia", "type": "Libro", "language": "Español"},
+}
+
+
+def build_inverted_index():
+    index = InvertedIndex()
+    index.build(DOCUMENTS)
+    return index
+
+
+def test_accents_and_case_are_folded():
+    index = build_inverted_index()
+    assert index.search("algebra") == {"a"}
+    assert index.search("CÁLCULO") == {"b"}
+    assert index.search("limites") == {"b"}
+
+
+def test_terms_match_by_prefix_and_all_must_match():
+    index = build_inverted_index()
+    assert index.search("calc dif") == {"b"}
+    assert index.search("tahuan") == {"c"}
+    assert index.search("histo ana") == set()
+
+
+def test_empty_query_returns_candidates():
+    index = build_inverted_index()
+    assert index.search("") == {"a", "b", "c"}
+    assert index.search("", candidates={"a"}) == {"a"}
+    assert index.search("lineal", candidates={"b", "c"}) == set()
+
+
+def test_incremental_add_and_remove():
+    index = build_inverted_index()
+    assert index.search("alg") == {"a"}
+
+    index.add("d", {"title": "Algoritmos", "author": "Ana"})
+    assert index.search("alg") == {"a", "d"}
+
+    index.add("a", {"title": "Geometría", "author": "Ana"})
+    assert index.search("alg") == {"d"}
+    assert index.search("geometria") == {"a"}
+
+    index.remove("d")
+    assert index.search("alg") == set()
+    assert "algoritmos" not in index.postings
+    assert index.search("ana") == {"a"}
+
+
+def build_facet_index():
+    index = FacetIndex()
+    index.build(BOOKS)
+    return index
+
+
+def test_facets_intersect():
+    index = build_facet_index()
+    assert index.lookup("category", "Matemáticas") == {"a", "b", "d"}
+    assert index.lookup("category", "Matemáticas") & index.lookup("type", "Libro") == {"a", "d"}
+    assert (
+        index.lookup("type", "Libro") & index.lookup("language", "Inglés")
+        & index.year_range(2016, 2030)
+    ) == {"d"}
+    assert index.lookup("level", "Avanzado") == set()
+
+
+def test_year_range_is_inclusive():
+    index = build_facet_index()
+    assert index.year_range(2019, 2021) == {"a", "b", "d"}
+    assert index.year_range(2020, 2020) == set()
+    assert index.year_range(2016, 2019) == {"a"}
+    # Sin año se indexa como 0
+    assert index.year_range(0, 2015) == {"c", "e"}
+
+
+def test_counts_follow_add_and_remove():
+    index = build_facet_index()
+    assert index.counts("category") == {"Matemáticas": 3, "Historia": 2}
+    assert index.counts("year") == {0: 1, 2015: 1, 2019: 1, 2021: 2}
+
+    index.add("b", {**BOOKS["b"], "category": "Historia", "year": 2015})
+    index.remove("d")
+    assert index.counts("category") == {"Matemáticas": 1, "Historia": 3}
+    assert index.counts("year") == {0: 1, 2015: 2, 2019: 1}
+    assert index.year_range(2015, 2015) == {"b", "c"}
+    assert index.lookup("language", "Inglés") == {"c"}
+
+
+def page_through(index, page_size, descending=False, members=None):
+    pages, after = [], None
+    while True:
+        page = index.page(page_size, after=after, descending=descending, members=members)
+        if not page:
+            return pages
+        pages.append(page)
+        after = index.key_of(page[-1])
+
+
+def build_sorted_index():
+    index = SortedIndex("year")
+    index.build(BOOKS)
+    return index
+
+
+def test_pages_follow_the_cursor_in_both_directions():
+    index = build_sorted_index()
+    assert page_through(index, 2) == [["e", "c"], ["a", "b"], ["d"]]
+    assert page_through(index, 2, descending=True) == [["d", "b"], ["a", "c"], ["e"]]
+
+
+def test_pages_of_a_subset():
+    index = build_sorted_index()
+    members = {"a", "d", "e", "x"}
+    assert page_through(index, 1, members=members) == [["e"], ["a"], ["d"]]
+    assert page_through(index, 2, descending=True, members=members) == [["d", "a"], ["e"]]
+
+
+def test_cursor_survives_removal_of_its_document():
+    index = build_sorted_index()
+    first = index.page(2)
+    assert first == ["e", "c"]
+    after = index.key_of(first[-1])
+
+    index.remove("c")
+    index.add("f", {"year": 2016})
+    assert index.key_of("c") is None
+    assert index.page(2, after=after) == ["f", "a"]
+    assert index.page(2, after=after, descending=True) == ["e"]
+
+
+def test_text_fields_sort_without_accents():
+    index = SortedIndex("title")
+    index.build(DOCUMENTS)
+    assert index.page(3) == ["a", "b", "c"]
@@ -0,0 +1,243 @@
+# utils/bulk_ingest.py
+"""Ingesta masiva de un directorio de documentos.
+
+Uso: python -m utils.bulk_ingest DIRECTORIO --metadata metadatos.csv --workers 4
+
+El archivo de metadatos (CSV o JSON) tiene una fila por documento con la
+columna `filename` y los campos del formulario de subida (title, category,
+type, level, language, author, year, tags, description).
+"""
+import pysqlite3
+import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+import os
+import csv
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Set
+
+from utils.document_manager import get_document_manager
+from utils.embedding_backends import get_ingestion_embeddings
+from utils.embeddings import CachedEmbeddings
+from utils import pdf_extraction
+from utils.ingestion import SUPPORTED_FORMATS, extract_document, register_document, write_document
+
+DEFAULT_METADATA = {
+    "type": "Material de Curso",
+    "level": "Intermedio",
+    "language": "Español",
+    "author": "",
+    "tags": [],
+    "description": ""
+}
+
+# Documentos extraídos que pueden esperar al escritor a la vez
+WRITER_QUEUE_SIZE = 4
+
+
+def load_sidecar(path: str) -> Dict[str, Dict]:
+    """Leer el archivo de metadatos y retornar {nombre de archivo: metadatos}."""
+    if path.lower().endswith(".json"):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            rows = [{"filename": filename, **row} for filename, row in data.items()]
+        else:
+            rows = data
+    else:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+
+    sidecar = {}
+    for row in rows:
+        row = {key: value for key, value in row.items() if value not in (None, "")}
+        filename = row.pop("filename", None)
+        if not filename:
+            continue
+        metadata = {**DEFAULT_METADATA, **row}
+        metadata.setdefault("title", Path(filename).stem)
+        try:
+            metadata["year"] = int(metadata.get("year") or datetime.now().year)
+        except (ValueError, TypeError):
+            print(f"Skipping {filename}: invalid year {metadata.get('year')!r}")
+            continue
+        if isinstance(metadata["tags"], str):
+            metadata["tags"] = [
+                tag.strip() for tag in metadata["tags"].replace(";", ",").split(",") if tag.strip()
+            ]
+        sidecar[filename] = metadata
+    return sidecar
+
+
+def plan_ingestion(directory: str, sidecar: Dict[str, Dict]) -> List[Dict]:
+    """Emparejar los archivos del directorio con sus metadatos."""
+    categories = get_document_manager().categories["categories"]
+    tasks = []
+    for filename, metadata in sorted(sidecar.items()):
+        file_path = os.path.join(directory, filename)
+        if not os.path.isfile(file_path):
+            print(f"Skipping {filename}: file not found")
+        elif Path(filename).suffix.lower()[1:] not in SUPPORTED_FORMATS:
+            print(f"Skipping {filename}: unsupported format")
+        elif metadata.get("category") not in categories:
+            print(f"Skipping {filename}: unknown category {metadata.get('category')!r}")
+        else:
+            tasks.append({"file_path": file_path, "filename": filename, "metadata": metadata})
+    return tasks
+
+
+def _init_extract_worker() -> None:
+    """Cada proceso del pool ya es un núcleo: sin paralelismo anidado por PDF."""
+    pdf_extraction.PDF_WORKERS = 1
+
+
+def _extract(task: Dict) -> Dict:
+    """Etapa de carga y división, ejecutada en el pool de procesos."""
+    started = time.perf_counter()
+    extracted = extract_document(
+        task["file_path"], task["filename"], task["metadata"], clean_sample=False
+    )
+    extracted["extract_seconds"] = time.perf_counter() - started
+    return extracted
+
+
+def _writer(pending: queue.Queue, embeddings: CachedEmbeddings, summary: Dict,
+            seen: Set[str], lock: threading.Lock) -> None:
+    """Etapa de embedding, escritura del vectorstore y registro.
+
+    Registrar hashes ya escritos evita procesar dos veces archivos
+    idénticos extraídos en paralelo.
+    """
+    while True:
+        item = pending.get()
+        if item is None:
+            return
+        task, extracted = item
+        started = time.perf_counter()
+
+        if extracted["success"] and not extracted["deduplicated"]:
+            with lock:
+                duplicate = extracted["content_hash"] in seen
+                seen.add(extracted["content_hash"])
+            if duplicate:
+                extracted.pop("chunks", None)
+                extracted["deduplicated"] = True
+
+        result = write_document(extracted, embeddings=embeddings)
+        if result["success"]:
+            try:
+                register_document(task["metadata"], result)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+
+        with lock:
+            summary["write_seconds"] += time.perf_counter() - started
+            summary["extract_seconds"] += extracted.get("extract_seconds", 0)
+            if not result["success"]:
+                summary["failed"] += 1
+                print(f"Error ingesting {task['filename']}: {result['error']}")
+            elif result["deduplicated"]:
+                summary["deduplicated"] += 1
+                print(f"Deduplicated {task['filename']}")
+            else:
+                summary["ingested"] += 1
+                summary["pages"] += result["num_pages"]
+                summary["chunks"] += result["num_chunks"]
+                print(f"Ingested {task['filename']} ({result['num_chunks']} chunks)")
+
+
+def run_bulk_ingest(tasks: List[Dict], workers: int, writers: int = 1,
+                    queue_size: int = WRITER_QUEUE_SIZE) -> Dict:
+    """Extraer en un pool de procesos y escribir a través de una cola acotada.
+
+    Cuando los escritores se retrasan la cola se llena y se deja de
+    enviar trabajo al pool, así la memoria queda acotada.
+    """
+    summary = {
+        "files": len(tasks), "ingested": 0, "deduplicated": 0, "failed": 0,
+        "pages": 0, "chunks": 0, "extract_seconds": 0.0, "write_seconds": 0.0
+    }
+    lock = threading.Lock()
+    seen: Set[str] = set()
+    pending: queue.Queue = queue.Queue(maxsize=queue_size)
+    embeddings = get_ingestion_embeddings()
+    started = time.perf_counter()
+
+    writer_threads = [
+        threading.Thread(target=_writer, args=(pending, embeddings, summary, seen, lock))
+        for _ in range(max(1, writers))
+    ]
+    for thread in writer_threads:
+        thread.start()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_extract_worker) as pool:
+            remaining = iter(tasks)
+            in_flight = {}
+            for task in remaining:
+                in_flight[pool.submit(_extract, task)] = task
+                if len(in_flight) >= workers:
+                    break
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = in_flight.pop(future)
+                    try:
+                        extracted = future.result()
+                    except Exception as e:
+                        extracted = {"success": False, "error": str(e)}
+                    pending.put((task, extracted))
+                    next_task = next(remaining, None)
+                    if next_task is not None:
+                        in_flight[pool.submit(_extract, next_task)] = next_task
+    finally:
+        for _ in writer_threads:
+            pending.put(None)
+        for thread in writer_threads:
+            thread.join()
+
+    elapsed = max(time.perf_counter() - started, 1e-6)
+    summary["elapsed_seconds"] = elapsed
+    summary["docs_per_second"] = (summary["ingested"] + summary["deduplicated"]) / elapsed
+    summary["chunks_per_second"] = summary["chunks"] / elapsed
+    summary["embedding_cache"] = embeddings.stats()
+    return summary
+
+
+def print_summary(summary: Dict) -> None:
+    print()
+    print(f"Files:            {summary['files']}")
+    print(f"Ingested:         {summary['ingested']}")
+    print(f"Deduplicated:     {summary['deduplicated']}")
+    print(f"Failed:           {summary['failed']}")
+    print(f"Pages / chunks:   {summary['pages']} / {summary['chunks']}")
+    print(f"Embedding cache:  {summary['embedding_cache']['hits']} hits, "
+          f"{summary['embedding_cache']['misses']} misses")
+    print(f"Extract time:     {summary['extract_seconds']:.1f}s (sum over workers)")
+    print(f"Write time:       {summary['write_seconds']:.1f}s")
+    print(f"Elapsed:          {summary['elapsed_seconds']:.1f}s")
+    print(f"Throughput:       {summary['docs_per_second']:.2f} docs/s, "
+          f"{summary['chunks_per_second']:.1f} chunks/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingesta masiva de documentos")
+    parser.add_argument("directory", help="Directorio con los documentos")
+    parser.add_argument("--metadata", required=True, help="Archivo CSV o JSON de metadatos")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Procesos de extracción")
+    parser.add_argument("--writers", type=int, default=1,
+                        help="Hilos de embedding y escritura")
+    parser.add_argument("--queue-size", type=int, default=WRITER_QUEUE_SIZE,
+                        help="Documentos extraídos en espera del escritor")
+    args = parser.parse_args()
+
+    tasks = plan_ingestion(args.directory, load_sidecar(args.metadata))
+    print(f"Ingesting {len(tasks)} documents with {args.workers} workers")
+    print_summary(run_bulk_ingest(tasks, args.workers, args.writers, args.queue_size))
@@ -0,0 +1,214 @@
+# utils/dedup.py
+"""Eliminación de texto repetido durante la ingesta.
+
+- Líneas de plantilla (encabezados, pies, numeración) detectadas en una
+  muestra de páginas y eliminadas de todas.
+- Fragmentos casi duplicados detectados con SimHash de 64 bits y bandas
+  LSH, para comparar solo contra candidatos.
+"""
+import os
+import re
+import hashlib
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Set
+
+from utils.search_index import normalize_text, tokenize
+
+# Distancia de Hamming máxima entre huellas para considerar dos
+# fragmentos casi duplicados
+SIMHASH_MAX_DISTANCE = int(os.environ.get("YACHANI_SIMHASH_MAX_DISTANCE", 6))
+
+# Páginas que se examinan para aprender las líneas de plantilla
+BOILERPLATE_SAMPLE_PAGES = 24
+
+# Fracción de las páginas de la muestra en las que debe aparecer una línea
+BOILERPLATE_MIN_RATIO = 0.5
+
+# Solo las primeras y últimas líneas no vacías de cada página (donde
+# están encabezados y pies) pueden ser plantilla, y siempre en la misma
+# posición; así no se borran líneas repetidas del cuerpo, como "}" o un
+# bucle en páginas de código
+BOILERPLATE_EDGE_LINES = 2
+
+# Letras mínimas de una línea de plantilla ("Página #" sí, "}" no)
+BOILERPLATE_MIN_LETTERS = 4
+
+# Tokens por shingle y mínimo de shingles para confiar en la huella
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 8
+
+DIGITS = re.compile(r"\d+")
+
+
+def empty_dedup_stats() -> Dict[str, int]:
+    """Contadores de lo eliminado en un documento."""
+    return {
+        "boilerplate_lines": 0,
+        "near_duplicate_chunks": 0,
+        "exact_duplicate_chunks": 0
+    }
+
+
+def normalize_line(line: str) -> str:
+    """Forma canónica de una línea: sin acentos ni espacios extra y con
+    los números unificados ("Página 12" == "Página 13")."""
+    return DIGITS.sub("#", " ".join(normalize_text(line).split()))
+
+
+def _shingle_hashes(text: str) -> List[int]:
+    """Hashes de 64 bits de los shingles de palabras del texto."""
+    tokens = tokenize(text)
+    shingles = {
+        " ".join(tokens[i:i + SHINGLE_SIZE])
+        for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))
+    }
+    return [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+        for s in shingles
+    ]
+
+
+def simhash(text: str) -> int:
+    """Huella SimHash de 64 bits: cada bit es el voto mayoritario de ese
+    bit entre los hashes de los shingles."""
+    hashes = _shingle_hashes(text)
+    if not hashes:
+        return 0
+    # Contar por columnas sobre las representaciones binarias (el conteo
+    # se hace en C, sin recorrer bit a bit en Python)
+    rows = [format(h, "064b") for h in hashes]
+    fingerprint = 0
+    for column in zip(*rows):
+        fingerprint = (fingerprint << 1) | (column.count("1") * 2 > len(hashes))
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateFilter:
+    """Detecta fragmentos casi iguales a otros ya vistos en el documento.
+
+    Con distancia máxima d, la huella se parte en d + 1 bandas: dos
+    huellas a distancia <= d coinciden al menos en una banda, así que
+    basta con comparar contra los fragmentos que comparten alguna.
+    """
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(self.bands)]
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (band * self.band_bits)) & mask for band in range(self.bands)]
+
+    def is_duplicate(self, text: str) -> bool:
+        """Retorna True si el texto es casi duplicado; si no, lo registra."""
+        if len(tokenize(text)) < MIN_SHINGLES + SHINGLE_SIZE - 1:
+            # Demasiado corto para una huella fiable
+            return False
+
+        fingerprint = simhash(text)
+        keys = self._band_keys(fingerprint)
+        for band, key in enumerate(keys):
+            for candidate in self._buckets[band].get(key, ()):
+                if hamming_distance(fingerprint, candidate) <= self.max_distance:
+                    return True
+
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(fingerprint)
+        return False
+
+
+def _edge_slots(lines: List[str], edge_lines: int) -> Dict[int, Set[int]]:
+    """Posiciones de borde de una página: índice de línea -> ranuras
+    (0, 1, ... desde arriba; -1, -2, ... desde abajo)."""
+    filled = [index for index, line in enumerate(lines) if line.strip()]
+    slots: Dict[int, Set[int]] = {}
+    for slot, index in enumerate(filled[:edge_lines]):
+        slots.setdefault(index, set()).add(slot)
+    for slot, index in enumerate(reversed(filled[-edge_lines:]), start=1):
+        slots.setdefault(index, set()).add(-slot)
+    return slots
+
+
+class BoilerplateDetector:
+    """Aprende qué líneas se repiten en la misma posición al inicio o al
+    final de la mayoría de las páginas."""
+
+    def __init__(self, min_ratio: float = BOILERPLATE_MIN_RATIO,
+                 edge_lines: int = BOILERPLATE_EDGE_LINES,
+                 min_letters: int = BOILERPLATE_MIN_LETTERS):
+        self.min_ratio = min_ratio
+        self.edge_lines = edge_lines
+        self.min_letters = min_letters
+        # Pares (ranura, línea normalizada)
+        self.lines: Set[tuple] = set()
+
+    def _candidates(self, text: str) -> Set[tuple]:
+        lines = text.splitlines()
+        return {
+            (slot, normalize_line(lines[index]))
+            for index, slots in _edge_slots(lines, self.edge_lines).items()
+            for slot in slots
+        }
+
+    def learn(self, pages: List[str]) -> None:
+        """Aprender las líneas de plantilla de una muestra de páginas."""
+        if len(pages) < 4:
+            return
+        counts = Counter()
+        for page in pages:
+            counts.update(self._candidates(page))
+        threshold = max(3, self.min_ratio * len(pages))
+        self.lines = {
+            (slot, line) for (slot, line), count in counts.items()
+            if count >= threshold and len(line) <= 200
+            and sum(c.isalpha() for c in line) >= self.min_letters
+        }
+
+    def strip(self, text: str) -> tuple:
+        """Eliminar las líneas de plantilla de los bordes de la página;
+        retorna (texto, líneas quitadas)."""
+        if not self.lines:
+            return text, 0
+        lines = text.splitlines()
+        edges = _edge_slots(lines, self.edge_lines)
+        kept = []
+        removed = 0
+        for index, line in enumerate(lines):
+            if any((slot, normalize_line(line)) in self.lines for slot in edges.get(index, ())):
+                removed += 1
+            else:
+                kept.append(line)
+        return "\n".join(kept), removed
+
+
+def strip_boilerplate(pages: Iterable, stats: Dict[str, int],
+                      sample_pages: int = BOILERPLATE_SAMPLE_PAGES) -> Iterator:
+    """Quitar las líneas de plantilla de un flujo de páginas (Documents).
+
+    Se retienen solo las primeras `sample_pages` páginas para aprender,
+    así la memoria sigue acotada en documentos grandes.
+    """
+    detector = BoilerplateDetector()
+    iterator = iter(pages)
+    sample = []
+    for page in iterator:
+        sample.append(page)
+        if len(sample) >= sample_pages:
+            break
+    detector.learn([page.page_content for page in sample])
+
+    def cleaned(page):
+        page.page_content, removed = detector.strip(page.page_content)
+        stats["boilerplate_lines"] += removed
+        return page
+
+    for page in sample:
+        yield cleaned(page)
+    for page in iterator:
+        yield cleaned(page)
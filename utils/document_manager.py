@@ -1,14 +1,22 @@
 # utils/document_manager.py
 import os
 import json
+import base64
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Set
 import hashlib
 from pathlib import Path
 import shutil
+import threading
+from utils.search_index import FacetIndex, InvertedIndex, SortedIndex
+from utils.metadata_store import create_metadata_store
+from utils.ingestion_stats import add_ingestion, build_stats, day_key, week_key
 
 class DocumentManager:
-    def __init__(self):
+    # Campos por los que se puede ordenar/paginar el catálogo
+    SORT_FIELDS = ("processed_date", "title", "year")
+
+    def __init__(self, storage: Optional[str] = None):
         # Definir estructura base de directorios
         self.BASE_DIR = "data"
         self.PROCESSED_DIR = os.path.join(self.BASE_DIR, "processed_docs")
@@ -18,9 +26,65 @@ class DocumentManager:
         # Crear estructura de directorios
         self._ensure_directory_structure()
         
+        # Motor de almacenamiento: "json" (por defecto), "journal" o "sqlite"
+        self.storage = storage or os.environ.get("YACHANI_METADATA_STORAGE", "json")
+        self.store = create_metadata_store(self.storage, self.BASE_DIR)
+        
+        # Protege el estado en memoria cuando la instancia es compartida
+        self._lock = threading.RLock()
+        self._signature = None
+        
         # Inicializar o cargar datos
-        self.metadata = self._load_metadata()
-        self.categories = self._load_categories()
+        self._load_state()
+
+    def _load_state(self):
+        """Cargar metadatos y categorías y reconstruir los índices."""
+        # Leer la versión antes de cargar: si alguien escribe mientras
+        # tanto, el próximo refresh volverá a cargar
+        signature = self.store.signature()
+        # Con SQLite las consultas van a la base: no se carga la biblioteca
+        metadata = {} if self.store.queryable else self._load_metadata()
+        categories = self._load_categories()
+        if "ingestion_stats" not in categories:
+            categories = self._rebuild_ingestion_stats(
+                self.store.load_metadata() if self.store.queryable else metadata
+            )
+
+        # Índice invertido para la búsqueda por texto
+        search_index = InvertedIndex()
+        search_index.build(metadata)
+        
+        # Índices secundarios para los filtros
+        facet_index = FacetIndex()
+        facet_index.build(metadata)
+        
+        # Índices ordenados para la paginación
+        sorted_indexes = {field: SortedIndex(field) for field in self.SORT_FIELDS}
+        for sorted_index in sorted_indexes.values():
+            sorted_index.build(metadata)
+        
+        # Hash del contenido del archivo -> documento (deduplicación)
+        content_index = {}
+        for doc_hash, doc in metadata.items():
+            if doc.get('content_hash'):
+                content_index.setdefault(doc['content_hash'], doc_hash)
+
+        with self._lock:
+            self.metadata = metadata
+            self.categories = categories
+            self.search_index = search_index
+            self.facet_index = facet_index
+            self.sorted_indexes = sorted_indexes
+            self.content_index = content_index
+            self._signature = signature
+
+    def refresh_if_stale(self) -> bool:
+        """Recargar solo si otro proceso o instancia modificó la biblioteca."""
+        with self._lock:
+            if self.store.signature() == self._signature:
+                return False
+            self._load_state()
+            return True
 
     def _ensure_directory_structure(self):
         """Crear estructura de directorios necesaria."""
@@ -29,22 +93,11 @@ class DocumentManager:
 
     def _load_metadata(self) -> Dict:
         """Cargar o crear archivo de metadatos."""
-        try:
-            if os.path.exists(self.METADATA_FILE):
-                with open(self.METADATA_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except json.JSONDecodeError:
-            print(f"Error decoding {self.METADATA_FILE}, creating new file")
-        except Exception as e:
-            print(f"Error loading metadata: {str(e)}")
-        
-        # Si hay error o no existe, crear nuevo
-        self._save_metadata({})
-        return {}
+        return self.store.load_metadata()
 
-    def _load_categories(self) -> Dict:
-        """Cargar o crear estructura de categorías."""
-        default_categories = {
+    def _default_categories(self) -> Dict:
+        """Estructura de categorías inicial."""
+        return {
             "categories": {
                 "Matemáticas": ["Álgebra", "Cálculo", "Geometría", "Estadística"],
                 "Ciencias": ["Física", "Química", "Biología", "Astronomía"],
@@ -55,35 +108,52 @@ class DocumentManager:
             },
             "category_counts": {}
         }
+
+    def _load_categories(self) -> Dict:
+        """Cargar o crear estructura de categorías."""
+        default_categories = self._default_categories()
         
-        try:
-            if os.path.exists(self.CATEGORIES_FILE):
-                with open(self.CATEGORIES_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except json.JSONDecodeError:
-            print(f"Error decoding {self.CATEGORIES_FILE}, creating new file")
-        except Exception as e:
-            print(f"Error loading categories: {str(e)}")
+        categories = self.store.load_categories()
+        if categories is not None:
+            return categories
         
         # Si hay error o no existe, crear nuevo
         self._save_categories(default_categories)
         return default_categories
 
+    def _rebuild_ingestion_stats(self, metadata: Dict) -> Dict:
+        """Reconstruir el histograma de ingestas (bibliotecas anteriores a él)."""
+        def rebuild(categories):
+            categories["ingestion_stats"] = build_stats(metadata)
+            return categories
+        
+        categories, version = self.store.update_categories(rebuild, self._default_categories())
+        self._track_write(version)
+        return categories
+
+    def rebuild_ingestion_stats(self) -> None:
+        """Recalcular el histograma de ingestas desde los metadatos actuales."""
+        with self._lock:
+            self.categories = self._rebuild_ingestion_stats(
+                self.store.load_metadata() if self.store.queryable else self.metadata
+            )
+
     def _save_metadata(self, metadata: Dict) -> None:
         """Guardar metadatos de forma segura."""
-        try:
-            with open(self.METADATA_FILE, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Error saving metadata: {str(e)}")
+        self._track_write(self.store.save_metadata(metadata))
 
     def _save_categories(self, categories: Dict) -> None:
         """Guardar categorías de forma segura."""
-        try:
-            with open(self.CATEGORIES_FILE, 'w', encoding='utf-8') as f:
-                json.dump(categories, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Error saving categories: {str(e)}")
+        self._track_write(self.store.save_categories(categories))
+
+    def _track_write(self, version: int) -> None:
+        """Avanzar la versión conocida tras una escritura propia.
+
+        Si otro proceso escribió entre medio, la versión no es consecutiva
+        y se deja la anterior para que el próximo refresh recargue.
+        """
+        if self._signature is not None and version == self._signature + 1:
+            self._signature = version
 
     def get_document_types(self) -> List[str]:
         """Obtener tipos de documentos disponibles."""
@@ -110,6 +180,8 @@ class DocumentManager:
 
     def get_total_documents(self) -> int:
         """Obtener número total de documentos."""
+        if self.store.queryable:
+            return self.store.count_documents()
         return len(self.metadata)
 
     def get_categories(self) -> Dict:
@@ -127,90 +199,279 @@ class DocumentManager:
 
     def get_documents_by_category(self, category: str) -> List[Dict]:
         """Obtener documentos de una categoría específica."""
-        return [
-            doc for doc in self.metadata.values()
-            if doc.get('category') == category
-        ]
+        if self.store.queryable:
+            return self.store.search(filters={'category': category})
+        with self._lock:
+            return [
+                self.metadata[doc_hash]
+                for doc_hash in self.facet_index.lookup('category', category)
+            ]
 
     def get_document(self, doc_hash: str) -> Optional[Dict]:
         """Obtener metadata de un documento específico."""
+        if self.store.queryable:
+            return self.store.get_document(doc_hash)
         return self.metadata.get(doc_hash)
 
+    def iter_documents(self) -> Iterable[Dict]:
+        """Recorrer todos los documentos (tareas de mantenimiento)."""
+        if self.store.queryable:
+            return self.store.iter_documents()
+        with self._lock:
+            return list(self.metadata.values())
+
+    def get_ingestion_stats(self) -> Dict:
+        """Obtener el histograma de ingestas (diario, semanal y por categoría)."""
+        return self.categories.get("ingestion_stats", {})
+
+    def find_by_content_hash(self, content_hash: str) -> Optional[Dict]:
+        """Obtener un documento ya procesado con el mismo contenido de archivo."""
+        if self.store.queryable:
+            return self.store.find_by_content_hash(content_hash)
+        doc_hash = self.content_index.get(content_hash)
+        return self.metadata.get(doc_hash) if doc_hash else None
+
     def get_new_documents_count(self, date: datetime) -> int:
         """Obtener cantidad de documentos nuevos para una fecha."""
-        count = 0
-        for doc in self.metadata.values():
-            try:
-                doc_date = datetime.fromisoformat(doc.get('processed_date', ''))
-                if doc_date.date() == date.date():
-                    count += 1
-            except (ValueError, TypeError):
-                continue
-        return count
+        return self.get_ingestion_stats().get("daily", {}).get(day_key(date.date()), 0)
+
+    def get_weekly_documents_count(self, date: datetime) -> int:
+        """Obtener cantidad de documentos nuevos en la semana de una fecha."""
+        return self.get_ingestion_stats().get("weekly", {}).get(week_key(date.date()), 0)
+
+    def get_category_documents_count(self, category: str, date: datetime) -> int:
+        """Obtener cantidad de documentos nuevos de una categoría en una fecha."""
+        category_daily = self.get_ingestion_stats().get("category_daily", {}).get(category, {})
+        return category_daily.get(day_key(date.date()), 0)
+
+    def get_facet_counts(self, field: str) -> Dict:
+        """Obtener el número de documentos por valor de un filtro."""
+        if self.store.queryable:
+            return self.store.facet_counts(field)
+        with self._lock:
+            return self.facet_index.counts(field)
 
     def search_documents(self, query: str = None, filters: Dict = None) -> List[Dict]:
         """Buscar documentos con filtros."""
-        results = self.metadata.values()
+        if self.store.queryable:
+            return self.store.search(query, filters)
+        with self._lock:
+            candidates = self._search_hashes(query, filters)
+            if candidates is None:
+                return list(self.metadata.values())
+            return sorted(
+                (self.metadata[doc_hash] for doc_hash in candidates),
+                key=lambda doc: doc.get('processed_date', ''),
+                reverse=True
+            )
+
+    def search_document_hashes(self, query: str = None, filters: Dict = None) -> Optional[Set[str]]:
+        """Buscar documentos y retornar solo sus hashes (None = todos)."""
+        if self.store.queryable:
+            return self.store.search_hashes(query, filters)
+        with self._lock:
+            return self._search_hashes(query, filters)
+
+    def get_documents_page(self, sort_key: str = "processed_date", page_size: int = 12,
+                           cursor: Optional[str] = None, descending: bool = True,
+                           doc_hashes: Optional[Set[str]] = None) -> Dict:
+        """Obtener una página de documentos ordenada.
+
+        `cursor` es el valor opaco `next_cursor` de la página anterior;
+        `doc_hashes` limita la paginación a un subconjunto (p. ej. el
+        resultado de `search_document_hashes`).
+        """
+        if sort_key not in self.SORT_FIELDS:
+            raise ValueError(f"Campo de orden no soportado: {sort_key}")
+        
+        after = None
+        if cursor:
+            state = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            if state["sort_key"] != sort_key or state["descending"] != descending:
+                raise ValueError("El cursor no corresponde a este orden")
+            after = tuple(state["after"])
+        
+        if self.store.queryable:
+            # Pedir un elemento extra para saber si hay página siguiente
+            rows = self.store.page(sort_key, page_size + 1, after, descending, doc_hashes)
+            total = self.store.count_documents() if doc_hashes is None else len(doc_hashes)
+            documents = [doc for _, doc in rows[:page_size]]
+            last_key = rows[page_size - 1][0] if len(rows) > page_size else None
+        else:
+            with self._lock:
+                sorted_index = self.sorted_indexes[sort_key]
+                hashes = sorted_index.page(page_size + 1, after, descending, doc_hashes)
+                total = len(self.metadata) if doc_hashes is None else len(doc_hashes)
+                documents = [self.metadata[doc_hash] for doc_hash in hashes[:page_size]]
+                last_key = sorted_index.key_of(hashes[page_size - 1]) if len(hashes) > page_size else None
+        
+        next_cursor = None
+        if last_key is not None:
+            next_cursor = base64.urlsafe_b64encode(json.dumps({
+                "sort_key": sort_key,
+                "descending": descending,
+                "after": list(last_key)
+            }).encode()).decode()
+        
+        return {
+            "documents": documents,
+            "next_cursor": next_cursor,
+            "total": total
+        }
+
+    def _search_hashes(self, query: str = None, filters: Dict = None) -> Optional[Set[str]]:
+        candidates = None
         
         if filters:
             for key, value in filters.items():
                 if value and value != "Todas" and value != "Todos":
                     if key == "year_range":
-                        results = [
-                            doc for doc in results
-                            if value[0] <= int(doc.get('year', 0)) <= value[1]
-                        ]
+                        matches = self.facet_index.year_range(value[0], value[1])
+                    elif key in FacetIndex.FACET_FIELDS:
+                        matches = self.facet_index.lookup(key, value)
                     else:
-                        results = [
-                            doc for doc in results
+                        matches = {
+                            doc_hash for doc_hash, doc in self.metadata.items()
                             if doc.get(key) == value
-                        ]
+                        }
+                    candidates = set(matches) if candidates is None else candidates & matches
         
         if query:
-            query = query.lower()
-            results = [
-                doc for doc in results
-                if any(
-                    query in str(value).lower()
-                    for value in [
-                        doc.get('title', ''),
-                        doc.get('description', ''),
-                        doc.get('author', ''),
-                        *doc.get('tags', [])
-                    ]
-                )
-            ]
+            candidates = self.search_index.search(query, candidates)
         
-        return list(results)
+        return candidates
 
     def add_document(self, metadata: dict, vectorstore_path: str, original_path: str) -> str:
-        """Agregar un nuevo documento."""
+        """Agregar un nuevo documento.
+
+        Otro archivo con el mismo título, autor y año recibe una clave que
+        incluye su `content_hash`; registrar de nuevo el mismo archivo
+        actualiza su entrada sin volver a contarlo.
+        """
         try:
-            # Generar hash único
-            doc_hash = hashlib.sha256(
-                f"{metadata['title']}_{metadata['author']}_{metadata['year']}".encode()
-            ).hexdigest()
-            
-            # Agregar información adicional
-            full_metadata = {
-                **metadata,
-                "hash": doc_hash,
-                "vectorstore_path": vectorstore_path,
-                "original_path": original_path,
-                "processed_date": datetime.now().isoformat()
-            }
+            with self._lock:
+                doc_hash = self._document_key(metadata)
+                if self.get_document(doc_hash) is not None:
+                    self.update_document(doc_hash, {
+                        **metadata,
+                        "vectorstore_path": vectorstore_path,
+                        "original_path": original_path
+                    })
+                    return doc_hash
+                
+                # Agregar información adicional
+                processed_date = datetime.now()
+                full_metadata = {
+                    **metadata,
+                    "hash": doc_hash,
+                    "vectorstore_path": vectorstore_path,
+                    "original_path": original_path,
+                    "processed_date": processed_date.isoformat()
+                }
+                
+                # Actualizar metadata
+                self._put_document(doc_hash, full_metadata)
+                
+                # Actualizar conteo de categorías e histograma de ingestas
+                category = metadata['category']
+                add_ingestion(self.categories, processed_date, category)
+                self._track_write(self.store.count_ingestion(
+                    category,
+                    processed_date,
+                    self._default_categories()
+                ))
             
-            # Actualizar metadata
-            self.metadata[doc_hash] = full_metadata
-            self._save_metadata(self.metadata)
-            
-            # Actualizar conteo de categorías
-            category = metadata['category']
-            self.categories['category_counts'][category] = \
-                self.categories['category_counts'].get(category, 0) + 1
-            self._save_categories(self.categories)
+            return doc_hash
             
+        except Exception as e:
+            raise Exception(f"Error adding document: {str(e)}")
+
+
+    def _put_document(self, doc_hash: str, doc: Dict, previous: Optional[Dict] = None) -> None:
+        """Guardar un documento y, sin SQLite, reflejarlo en los índices en
+        memoria. Se llama con el bloqueo tomado."""
+        if self.store.queryable:
+            self._track_write(self.store.put_document(doc_hash, doc))
+            return
+        
+        self.metadata[doc_hash] = doc
+        self._track_write(self.store.put_document(doc_hash, doc, self.metadata))
+        self.search_index.add(doc_hash, doc)
+        self.facet_index.add(doc_hash, doc)
+        for sorted_index in self.sorted_indexes.values():
+            sorted_index.add(doc_hash, doc)
+        
+        old_content_hash = (previous or {}).get('content_hash')
+        if old_content_hash and self.content_index.get(old_content_hash) == doc_hash:
+            del self.content_index[old_content_hash]
+        if doc.get('content_hash'):
+            self.content_index.setdefault(doc['content_hash'], doc_hash)
+
+    def _document_key(self, metadata: Dict) -> str:
+        """Clave de un documento: sha256 de título, autor y año, más el
+        `content_hash` si esa clave ya es de otro archivo."""
+        base = f"{metadata['title']}_{metadata['author']}_{metadata['year']}"
+        doc_hash = hashlib.sha256(base.encode()).hexdigest()
+        current = self.get_document(doc_hash)
+        if current is None or current.get('content_hash') == metadata.get('content_hash'):
             return doc_hash
+        return hashlib.sha256(f"{base}_{metadata.get('content_hash')}".encode()).hexdigest()
+
+    def update_document(self, doc_hash: str, updates: Dict) -> Dict:
+        """Actualizar en sitio la metadata de un documento existente.
+
+        Conserva el hash y la fecha de procesamiento originales y mantiene
+        al día los índices y el conteo de categorías.
+        """
+        try:
+            with self._lock:
+                current = self.get_document(doc_hash)
+                if current is None:
+                    raise KeyError(f"Documento no encontrado: {doc_hash}")
+                
+                full_metadata = {
+                    **current,
+                    **updates,
+                    "hash": doc_hash,
+                    "updated_date": datetime.now().isoformat()
+                }
+                self._put_document(doc_hash, full_metadata, current)
+                
+                old_category = current.get('category')
+                new_category = full_metadata.get('category')
+                if old_category != new_category:
+                    def move_category(categories):
+                        counts = categories.setdefault('category_counts', {})
+                        if old_category in counts:
+                            counts[old_category] = max(0, counts[old_category] - 1)
+                        counts[new_category] = counts.get(new_category, 0) + 1
+                        return categories
+                    
+                    self.categories, version = self.store.update_categories(
+                        move_category,
+                        self._default_categories()
+                    )
+                    self._track_write(version)
+            
+            return full_metadata
             
         except Exception as e:
-            raise Exception(f"Error adding document: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error updating document: {str(e)}")
+
+_shared_manager: Optional[DocumentManager] = None
+_shared_lock = threading.Lock()
+
+
+def get_document_manager() -> DocumentManager:
+    """Obtener la instancia compartida por todo el proceso.
+
+    Se reutiliza entre sesiones y reruns de Streamlit y solo se recarga
+    cuando cambia la versión de la biblioteca.
+    """
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = DocumentManager()
+            return _shared_manager
+    _shared_manager.refresh_if_stale()
+    return _shared_manager
@@ -0,0 +1,166 @@
+# utils/embedding_backends.py
+"""Registro de backends de embeddings.
+
+El backend se elige con YACHANI_EMBEDDING_BACKEND:
+- openai: OpenAIEmbeddings (por defecto).
+- hashing: embeddings locales por hashing de términos, sin red ni GPU.
+
+Cada vectorstore guarda en `embedding_backend.json` el backend y el
+modelo con que se creó, para detectar al abrirlo que no se mezclen
+vectores de espacios distintos.
+"""
+import os
+import zlib
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils.embeddings import BatchedEmbeddings, CachedEmbeddings, embedding_model_name
+from utils.file_storage import atomic_write_json, read_json
+from utils.search_index import tokenize
+
+EMBEDDING_BACKEND = os.environ.get("YACHANI_EMBEDDING_BACKEND", "openai")
+
+# Dimensiones del backend de hashing
+HASHING_DIMENSIONS = int(os.environ.get("YACHANI_HASHING_DIMENSIONS", 1024))
+
+# Archivo del vectorstore con el backend que lo generó
+BACKEND_MARKER = "embedding_backend.json"
+
+# Backend de los vectorstores anteriores al registro (sin marcador)
+LEGACY_BACKEND = "openai"
+
+
+@lru_cache(maxsize=200000)
+def _feature(term: str, dimensions: int) -> tuple:
+    """Columna y signo de un término (crc32 es estable entre procesos)."""
+    digest = zlib.crc32(term.encode("utf-8"))
+    return digest % dimensions, 1.0 if digest & 0x80000000 else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    """Embeddings locales por feature hashing de palabras y bigramas.
+
+    Cada término suma ±1 en una columna elegida por su hash; las
+    frecuencias se amortiguan con log1p y cada vector se normaliza (L2),
+    así la similitud coseno se comporta como la de un TF-IDF sin
+    vocabulario. Los lotes se acumulan en una sola matriz de NumPy.
+    """
+
+    model = "hashing-v1"
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _terms(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for term in self._terms(text):
+                column, sign = _feature(term, self.dimensions)
+                rows.append(row)
+                columns.append(column)
+                signs.append(sign)
+
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)),
+                  np.array(signs, dtype=np.float32))
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+
+def _openai_embeddings() -> Embeddings:
+    from langchain_openai.embeddings import OpenAIEmbeddings
+    return OpenAIEmbeddings()
+
+
+# Backends disponibles: nombre -> (fábrica, es remoto)
+EMBEDDING_BACKENDS: Dict[str, tuple] = {
+    "openai": (_openai_embeddings, True),
+    "hashing": (HashingEmbeddings, False)
+}
+
+
+def register_backend(name: str, factory: Callable[[], Embeddings], remote: bool = True) -> None:
+    """Agregar un backend al registro."""
+    EMBEDDING_BACKENDS[name] = (factory, remote)
+
+
+def backend_name(backend: Optional[str] = None) -> str:
+    name = backend or EMBEDDING_BACKEND
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Backend de embeddings no soportado: {name}")
+    return name
+
+
+def get_embeddings(backend: Optional[str] = None) -> Embeddings:
+    """Embeddings del backend configurado, para consultas."""
+    factory, _ = EMBEDDING_BACKENDS[backend_name(backend)]
+    return factory()
+
+
+def get_ingestion_embeddings(backend: Optional[str] = None) -> CachedEmbeddings:
+    """Embeddings para ingerir: con caché persistente y, si el backend es
+    remoto, en lotes paralelos con backoff."""
+    factory, remote = EMBEDDING_BACKENDS[backend_name(backend)]
+    embeddings = factory()
+    return CachedEmbeddings(BatchedEmbeddings(embeddings) if remote else embeddings)
+
+
+def backend_signature(embeddings: Embeddings, backend: Optional[str] = None) -> Dict[str, str]:
+    """Backend y modelo que identifican el espacio de los vectores."""
+    if isinstance(embeddings, CachedEmbeddings):
+        embeddings = embeddings.underlying
+    if isinstance(embeddings, BatchedEmbeddings):
+        embeddings = embeddings.underlying
+    return {"backend": backend_name(backend), "model": embedding_model_name(embeddings)}
+
+
+def read_backend_marker(vectorstore_path: str) -> Dict[str, str]:
+    """Backend registrado de un vectorstore (los antiguos son de OpenAI)."""
+    return read_json(os.path.join(vectorstore_path, BACKEND_MARKER), None) or {
+        "backend": LEGACY_BACKEND
+    }
+
+
+def write_backend_marker(vectorstore_path: str, embeddings: Embeddings,
+                         backend: Optional[str] = None) -> None:
+    atomic_write_json(
+        os.path.join(vectorstore_path, BACKEND_MARKER),
+        backend_signature(embeddings, backend)
+    )
+
+
+def backend_matches(vectorstore_path: str, embeddings: Embeddings,
+                    backend: Optional[str] = None) -> bool:
+    """Retorna True si el vectorstore se creó con este backend y modelo."""
+    marker = read_backend_marker(vectorstore_path)
+    signature = backend_signature(embeddings, backend)
+    if marker["backend"] != signature["backend"]:
+        return False
+    return "model" not in marker or marker["model"] == signature["model"]
+
+
+def verify_backend(vectorstore_path: str, embeddings: Embeddings,
+                   backend: Optional[str] = None) -> None:
+    """Fallar si el vectorstore se creó con otro backend de embeddings."""
+    if not backend_matches(vectorstore_path, embeddings, backend):
+        marker = read_backend_marker(vectorstore_path)
+        signature = backend_signature(embeddings, backend)
+        raise ValueError(
+            f"El vectorstore {vectorstore_path} se creó con el backend "
+            f"{marker['backend']} ({marker.get('model', 'modelo desconocido')}) y el "
+            f"backend actual es {signature['backend']} ({signature['model']})"
+        )
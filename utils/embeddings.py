@@ -0,0 +1,330 @@
+# utils/embeddings.py
+import os
+import time
+import random
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import tiktoken
+from langchain_core.embeddings import Embeddings
+
+from utils.search_index import normalize_chunk_text, text_hash
+
+EMBEDDING_CACHE_FILE = os.path.join("data", "embedding_cache.sqlite3")
+
+# Límite de parámetros por consulta de SQLite
+SQLITE_BATCH = 500
+
+# Tokens máximos por lote y lotes simultáneos hacia el proveedor
+EMBEDDING_BATCH_TOKENS = int(os.environ.get("YACHANI_EMBEDDING_BATCH_TOKENS", 20000))
+EMBEDDING_CONCURRENCY = int(os.environ.get("YACHANI_EMBEDDING_CONCURRENCY", 4))
+
+# Consultas cuyo embedding se conserva en memoria y segundos de validez
+QUERY_CACHE_SIZE = int(os.environ.get("YACHANI_QUERY_CACHE_SIZE", 1024))
+QUERY_CACHE_TTL = float(os.environ.get("YACHANI_QUERY_CACHE_TTL", 3600))
+
+
+def embedding_model_name(embeddings: Embeddings) -> str:
+    """Identificador del modelo de embeddings (parte de la clave de caché)."""
+    model = getattr(embeddings, "model", None) or type(embeddings).__name__
+    dimensions = getattr(embeddings, "dimensions", None)
+    return f"{model}:{dimensions}" if dimensions else model
+
+
+class CachedEmbeddings(Embeddings):
+    """Caché persistente de embeddings delante de un proveedor.
+
+    La clave es (modelo, hash del texto normalizado), de modo que los
+    fragmentos ya embebidos en otra carga no vuelven a la API.
+    """
+
+    def __init__(self, underlying: Embeddings, cache_file: str = EMBEDDING_CACHE_FILE):
+        self.underlying = underlying
+        self.model_name = embedding_model_name(underlying)
+        self.cache_file = cache_file
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.cache_file, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _load(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(hashes), SQLITE_BATCH):
+                batch = hashes[start:start + SQLITE_BATCH]
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(batch))})",
+                    [self.model_name, *batch]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [
+                    (self.model_name, key, array("f", vector).tobytes())
+                    for key, vector in vectors.items()
+                ]
+            )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeber fragmentos consultando primero la caché."""
+        hashes = [text_hash(text) for text in texts]
+        cached = self._load(list(set(hashes)))
+
+        # Embeber una sola vez cada texto faltante (también si se repite)
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            new_vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self._store(computed)
+            cached.update(computed)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+        return [cached[key] for key in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de aciertos y fallos de la caché."""
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class QueryEmbeddingCache:
+    """Caché LRU en memoria de embeddings de consultas, con caducidad.
+
+    Es compartida por todo el proceso, así las preguntas repetidas (o
+    populares entre usuarios) no vuelven a la API.
+    """
+
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: tuple) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, key: tuple, vector: List[float]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def embed_query(self, embeddings: Embeddings, text: str) -> List[float]:
+        """Embedding de una consulta, desde la caché si es posible."""
+        key = (embedding_model_name(embeddings), normalize_chunk_text(text))
+        vector = self._get(key)
+        if vector is None:
+            vector = embeddings.embed_query(text)
+            self._put(key, vector)
+        return vector
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de aciertos y fallos de la caché."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+query_embedding_cache = QueryEmbeddingCache()
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Detectar respuestas 429 del proveedor de embeddings.
+
+    Solo por el tipo o el código HTTP: el texto del error puede contener
+    "429" en un id de petición o un número de tokens.
+    """
+    if type(error).__name__ == "RateLimitError":
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code == 429
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Leer el encabezado Retry-After de la respuesta, si existe."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """Límite de concurrencia que se reduce a la mitad ante un 429 y
+    vuelve a crecer de a uno tras varias respuestas exitosas."""
+
+    def __init__(self, max_concurrency: int, successes_to_grow: int = 5):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.successes_to_grow = successes_to_grow
+        self._active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+
+    def release(self, rate_limited: bool = False) -> None:
+        with self._condition:
+            self._active -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.successes_to_grow and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+class BatchedEmbeddings(Embeddings):
+    """Embeber fragmentos en lotes por tokens, en paralelo y con backoff.
+
+    `progress_callback(hechos, total, fragmentos_por_segundo)` se invoca
+    desde el hilo que llamó a `embed_documents`.
+    """
+
+    def __init__(self, underlying: Embeddings,
+                 max_batch_tokens: int = EMBEDDING_BATCH_TOKENS,
+                 max_concurrency: int = EMBEDDING_CONCURRENCY,
+                 max_retries: int = 6,
+                 progress_callback: Optional[Callable[[int, int, float], None]] = None,
+                 encoding_name: str = "cl100k_base"):
+        self.underlying = underlying
+        self.model = embedding_model_name(underlying)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        # Compartido entre llamadas: el backoff ante un 429 se mantiene de
+        # una ventana de fragmentos a la siguiente
+        self.limiter = AdaptiveConcurrencyLimiter(max_concurrency)
+        self.max_retries = max_retries
+        self.progress_callback = progress_callback
+        self.encoding = tiktoken.get_encoding(encoding_name)
+        self.last_stats: Dict[str, float] = {}
+
+    def _make_batches(self, texts: List[str]) -> List[List[int]]:
+        """Agrupar índices de textos en lotes que no superen el límite de tokens."""
+        batches, current, current_tokens = [], [], 0
+        for index, text in enumerate(texts):
+            tokens = len(self.encoding.encode(text, disallowed_special=()))
+            if current and current_tokens + tokens > self.max_batch_tokens:
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, texts: List[str]) -> tuple:
+        """Embeber un lote reintentando con backoff exponencial ante un 429."""
+        limiter = self.limiter
+        retries = 0
+        while True:
+            limiter.acquire()
+            try:
+                vectors = self.underlying.embed_documents(texts)
+            except Exception as e:
+                limiter.release(rate_limited=is_rate_limit_error(e))
+                if not is_rate_limit_error(e) or retries >= self.max_retries:
+                    raise
+                delay = retry_after_seconds(e) or min(60, 2 ** retries)
+                time.sleep(delay + random.uniform(0, 1))
+                retries += 1
+                continue
+            limiter.release()
+            return vectors, retries
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeber fragmentos conservando el orden de entrada."""
+        started = time.perf_counter()
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        batches = self._make_batches(texts)
+        done = 0
+        retries = 0
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as pool:
+            futures = {
+                pool.submit(self._embed_batch, [texts[i] for i in batch]): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                vectors, batch_retries = future.result()
+                for index, vector in zip(batch, vectors):
+                    results[index] = vector
+                done += len(batch)
+                retries += batch_retries
+                if self.progress_callback:
+                    elapsed = max(time.perf_counter() - started, 1e-6)
+                    self.progress_callback(done, len(texts), done / elapsed)
+
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        self.last_stats = {
+            "chunks": len(texts),
+            "batches": len(batches),
+            "seconds": elapsed,
+            "chunks_per_second": len(texts) / elapsed,
+            "rate_limit_retries": retries,
+            "concurrency_limit": self.limiter.limit
+        }
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
@@ -0,0 +1,221 @@
+# utils/extractors.py
+"""Extractores de texto nativos por formato.
+
+Los loaders Unstructured solo se importan (de forma perezosa) para los
+formatos sin extractor nativo o cuando el nativo falla.
+"""
+import importlib
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List
+
+from docx import Document as DocxDocument
+from pptx import Presentation
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+from utils.pdf_extraction import get_pdf_loader
+
+# Caracteres por Document al leer texto plano en streaming
+TEXT_BLOCK_CHARS = 64 * 1024
+
+
+class DocxLoader(BaseLoader):
+    """Párrafos y tablas de un .docx con python-docx, en orden del documento."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def lazy_load(self) -> Iterator[Document]:
+        document = DocxDocument(self.file_path)
+        parts = []
+        for block in document.element.body.iterchildren():
+            tag = block.tag.rsplit("}", 1)[-1]
+            if tag == "p":
+                text = "".join(node.text or "" for node in block.iter() if node.tag.endswith("}t"))
+                if text.strip():
+                    parts.append(text)
+            elif tag == "tbl":
+                for row in block.iter():
+                    if row.tag.endswith("}tr"):
+                        cells = [
+                            "".join(node.text or "" for node in cell.iter() if node.tag.endswith("}t"))
+                            for cell in row.iterchildren() if cell.tag.endswith("}tc")
+                        ]
+                        parts.append(" | ".join(cells))
+        yield Document(page_content="\n\n".join(parts), metadata={"source": self.file_path})
+
+
+class PptxLoader(BaseLoader):
+    """Texto de cada diapositiva de un .pptx con python-pptx (una por Document)."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def lazy_load(self) -> Iterator[Document]:
+        presentation = Presentation(self.file_path)
+        for index, slide in enumerate(presentation.slides):
+            texts = []
+            for shape in slide.shapes:
+                if shape.has_text_frame:
+                    texts.append(shape.text_frame.text)
+                elif getattr(shape, "has_table", False) and shape.has_table:
+                    for row in shape.table.rows:
+                        texts.append(" | ".join(cell.text for cell in row.cells))
+            if slide.has_notes_slide:
+                texts.append(slide.notes_slide.notes_text_frame.text)
+            yield Document(
+                page_content="\n".join(text for text in texts if text.strip()),
+                metadata={"source": self.file_path, "page": index}
+            )
+
+
+class TextStreamLoader(BaseLoader):
+    """Texto plano leído en bloques de líneas, sin cargar el archivo completo."""
+
+    def __init__(self, file_path: str, block_chars: int = TEXT_BLOCK_CHARS):
+        self.file_path = file_path
+        self.block_chars = block_chars
+
+    def lazy_load(self) -> Iterator[Document]:
+        block: List[str] = []
+        size = 0
+        index = 0
+        with open(self.file_path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                block.append(line)
+                size += len(line)
+                if size >= self.block_chars:
+                    yield Document(
+                        page_content="".join(block),
+                        metadata={"source": self.file_path, "page": index}
+                    )
+                    block, size, index = [], 0, index + 1
+        if block or index == 0:
+            yield Document(
+                page_content="".join(block),
+                metadata={"source": self.file_path, "page": index}
+            )
+
+
+class _HTMLTextParser(HTMLParser):
+    """Recolecta el texto visible; las etiquetas de bloque cortan línea."""
+
+    SKIP_TAGS = {"script", "style", "noscript", "template", "head"}
+    BLOCK_TAGS = {
+        "p", "div", "br", "li", "ul", "ol", "tr", "table", "section", "article",
+        "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "header", "footer"
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title = ""
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+class HTMLTextLoader(BaseLoader):
+    """Texto visible de un HTML con el parser de la biblioteca estándar."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def lazy_load(self) -> Iterator[Document]:
+        parser = _HTMLTextParser()
+        with open(self.file_path, "r", encoding="utf-8", errors="replace") as f:
+            for block in iter(lambda: f.read(TEXT_BLOCK_CHARS), ""):
+                parser.feed(block)
+        parser.close()
+        metadata = {"source": self.file_path}
+        if parser.title.strip():
+            metadata["title"] = parser.title.strip()
+        yield Document(page_content=parser.text(), metadata=metadata)
+
+
+class FallbackLoader(BaseLoader):
+    """Usa el extractor nativo y, si falla antes de producir texto, el
+    loader Unstructured del formato."""
+
+    def __init__(self, native: BaseLoader, fallback_name: str, file_path: str):
+        self.native = native
+        self.fallback_name = fallback_name
+        self.file_path = file_path
+
+    def lazy_load(self) -> Iterator[Document]:
+        produced = False
+        try:
+            for document in self.native.lazy_load():
+                produced = True
+                yield document
+        except Exception as e:
+            if produced:
+                raise
+            print(f"Native extractor failed for {self.file_path}, using {self.fallback_name}: {str(e)}")
+            yield from load_unstructured(self.fallback_name, self.file_path).lazy_load()
+
+
+# Extractores nativos por extensión
+EXTRACTORS = {
+    "docx": DocxLoader,
+    "pptx": PptxLoader,
+    "txt": TextStreamLoader,
+    "html": HTMLTextLoader
+}
+
+# Loaders Unstructured (langchain_community) por extensión
+UNSTRUCTURED_LOADERS: Dict[str, str] = {
+    "docx": "UnstructuredWordDocumentLoader",
+    "doc": "UnstructuredWordDocumentLoader",
+    "epub": "UnstructuredEPubLoader",
+    "html": "UnstructuredHTMLLoader",
+    "pptx": "UnstructuredPowerPointLoader",
+    "ppt": "UnstructuredPowerPointLoader"
+}
+
+
+def load_unstructured(loader_name: str, file_path: str) -> BaseLoader:
+    """Importar un loader Unstructured solo cuando se necesita."""
+    module = importlib.import_module("langchain_community.document_loaders")
+    return getattr(module, loader_name)(file_path)
+
+
+def get_loader(file_path: str, file_type: str) -> BaseLoader:
+    """Retorna el loader apropiado según el tipo de archivo."""
+    if file_type == "pdf":
+        return get_pdf_loader(file_path)
+
+    native = EXTRACTORS.get(file_type)
+    fallback = UNSTRUCTURED_LOADERS.get(file_type)
+    if native and fallback:
+        return FallbackLoader(native(file_path), fallback, file_path)
+    if native:
+        return native(file_path)
+    if fallback:
+        return load_unstructured(fallback, file_path)
+    raise ValueError(f"Formato no soportado: {file_type}")
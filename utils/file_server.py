@@ -0,0 +1,190 @@
+# utils/file_server.py
+import os
+import re
+import mimetypes
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from utils.document_manager import get_document_manager
+
+# Tamaño de cada bloque leído del disco al servir un archivo
+CHUNK_SIZE = 64 * 1024
+
+FILE_SERVER_HOST = os.environ.get("YACHANI_FILE_SERVER_HOST", "127.0.0.1")
+FILE_SERVER_PORT = int(os.environ.get("YACHANI_FILE_SERVER_PORT", 8503))
+
+# URL pública del servidor. Sin ella no se inicia: el servidor no tiene
+# autenticación y un enlace a localhost no sirve a otros equipos, así
+# que las páginas descargan desde la propia aplicación
+FILE_SERVER_URL = os.environ.get("YACHANI_FILE_SERVER_URL", "").rstrip("/")
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def parse_range(header: Optional[str], file_size: int) -> Optional[Tuple[int, int]]:
+    """Interpretar un encabezado Range de un solo rango.
+
+    Retorna (inicio, fin) inclusivo, None si no hay rango (o pide varios,
+    que no se soportan y se responden con el archivo completo), o lanza
+    ValueError si el rango no es satisfacible.
+    """
+    if not header or "," in header:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        raise ValueError(f"Rango inválido: {header}")
+
+    start, end = match.groups()
+    if not start:
+        # bytes=-N: los últimos N bytes
+        length = int(end)
+        if length == 0 or file_size == 0:
+            raise ValueError(f"Rango no satisfacible: {header}")
+        return max(0, file_size - length), file_size - 1
+    start = int(start)
+    end = min(int(end), file_size - 1) if end else file_size - 1
+    if start >= file_size or start > end:
+        raise ValueError(f"Rango no satisfacible: {header}")
+    return start, end
+
+
+class DocumentFileHandler(BaseHTTPRequestHandler):
+    """Sirve los originales de la biblioteca en bloques, con soporte de rangos."""
+
+    def _resolve_path(self) -> Optional[str]:
+        """Obtener la ruta del original a partir de /documents/<hash>."""
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "documents":
+            return None
+        doc = get_document_manager().get_document(parts[1])
+        if not doc:
+            return None
+        path = doc.get('original_path')
+        return path if path and os.path.isfile(path) else None
+
+    def _serve(self, send_body: bool):
+        path = self._resolve_path()
+        if not path:
+            self.send_error(404, "Documento no encontrado")
+            return
+
+        file_size = os.path.getsize(path)
+        try:
+            byte_range = parse_range(self.headers.get("Range"), file_size)
+        except ValueError:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{file_size}")
+            self.end_headers()
+            return
+
+        start, end = byte_range if byte_range else (0, file_size - 1)
+        length = max(0, end - start + 1)
+        filename = os.path.basename(path)
+
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(filename)}")
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{file_size}")
+        self.end_headers()
+
+        if not send_body:
+            return
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def log_message(self, format, *args):
+        # Silenciar el log por petición
+        pass
+
+
+def ensure_file_server() -> str:
+    """Iniciar (una vez por proceso) el servidor de descargas y retornar su URL pública.
+
+    Si el puerto ya está ocupado se asume que otro proceso de la
+    aplicación lo está sirviendo.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((FILE_SERVER_HOST, FILE_SERVER_PORT), DocumentFileHandler)
+                _server.daemon_threads = True
+                threading.Thread(target=_server.serve_forever, daemon=True).start()
+            except OSError as e:
+                print(f"File server not started on port {FILE_SERVER_PORT}: {str(e)}")
+                _server = False
+    return FILE_SERVER_URL
+
+
+def file_server_enabled() -> bool:
+    """Retorna True si se configuró la URL pública del servidor de descargas."""
+    return bool(FILE_SERVER_URL)
+
+
+def get_download_url(doc_hash: str) -> Optional[str]:
+    """URL de descarga del original de un documento (None sin servidor)."""
+    if not file_server_enabled():
+        return None
+    return f"{ensure_file_server()}/documents/{doc_hash}"
+
+
+def show_download(doc_hash: str, original_path: str, label: str, key: str) -> None:
+    """Mostrar la descarga del original en una página de Streamlit.
+
+    Con servidor de descargas es un enlace (lectura por bloques y rangos);
+    si no, un botón de la propia aplicación que lee el archivo solo
+    cuando el usuario lo pide y una sola vez por clic.
+    """
+    import streamlit as st
+
+    url = get_download_url(doc_hash)
+    if url:
+        st.markdown(
+            f'<a href="{url}" download class="download-link">{label}</a>',
+            unsafe_allow_html=True
+        )
+        return
+    if not original_path or not os.path.exists(original_path):
+        return
+
+    ready_key = f"download_ready_{key}"
+    if not st.session_state.get(ready_key):
+        if st.button(label, key=f"prepare_{key}"):
+            st.session_state[ready_key] = True
+            st.rerun()
+        return
+
+    filename = os.path.basename(original_path)
+    with open(original_path, "rb") as f:
+        st.download_button(
+            f"💾 Guardar {filename}",
+            data=f,
+            file_name=filename,
+            mime=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            key=f"download_{key}"
+        )
+    # El siguiente rerun vuelve a mostrar el botón de preparar en lugar de
+    # releer el archivo
+    st.session_state[ready_key] = False
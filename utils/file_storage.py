@@ -0,0 +1,122 @@
+# utils/file_storage.py
+import os
+import json
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True):
+    """Bloqueo exclusivo (advisory) entre procesos sobre `path`.
+
+    Se bloquea un archivo `<path>.lock` auxiliar para no interferir con
+    los renombrados atómicos del archivo protegido. Con `blocking=False`
+    lanza BlockingIOError si otro proceso ya tiene el bloqueo.
+    """
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a+") as lock_file:
+        try:
+            if fcntl:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(lock_file.fileno(), flags)
+            else:
+                lock_file.seek(0)
+                mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+                msvcrt.locking(lock_file.fileno(), mode, 1)
+        except OSError as e:
+            if blocking:
+                raise
+            raise BlockingIOError(f"Lock held on {path}") from e
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write_json(path: str, data: Any, indent: int = 2) -> None:
+    """Escribir JSON en un temporal del mismo directorio y renombrarlo.
+
+    Los lectores ven el archivo anterior o el nuevo, nunca uno a medias.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory,
+        prefix=f".{os.path.basename(path)}.",
+        suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    """Leer JSON; si el archivo está corrupto se aparta una copia y se
+    retorna `default` en lugar de sobrescribirlo."""
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        backup_path = f"{path}.corrupt-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        shutil.copy2(path, backup_path)
+        print(f"Error decoding {path}, copy saved to {backup_path}")
+        return default
+
+
+def update_json(path: str, update_fn: Callable[[Any], Any], default: Any = None) -> Any:
+    """Ciclo leer-modificar-escribir protegido por un bloqueo entre procesos.
+
+    `update_fn` recibe el contenido actual y retorna el nuevo.
+    """
+    with file_lock(path):
+        data = update_fn(read_json(path, default))
+        atomic_write_json(path, data)
+    return data
+
+
+def read_change_version(path: str) -> int:
+    """Leer el contador de cambios (0 si aún no existe)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def notify_change(path: str) -> int:
+    """Incrementar el contador de cambios y retornar la nueva versión.
+
+    Las cachés de otros procesos comparan este número (una lectura de
+    pocos bytes) en lugar de volver a leer los datos en cada rerun.
+    """
+    with file_lock(path):
+        version = read_change_version(path) + 1
+        directory = os.path.dirname(path) or "."
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".version.", suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(str(version))
+        os.replace(temp_path, path)
+    return version
@@ -0,0 +1,742 @@
+# utils/ingestion.py
+import os
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_chroma import Chroma
+from langchain_openai import ChatOpenAI
+import fitz  # PyMuPDF
+from pptx import Presentation
+
+from utils.dedup import NearDuplicateFilter, empty_dedup_stats, strip_boilerplate
+from utils.document_manager import get_document_manager
+from utils.embedding_backends import (
+    LEGACY_BACKEND, backend_matches, backend_name, get_ingestion_embeddings,
+    read_backend_marker, write_backend_marker
+)
+from utils.embeddings import BatchedEmbeddings, CachedEmbeddings
+from utils.extractors import TEXT_BLOCK_CHARS, get_loader
+from utils.lexical_index import LexicalIndex
+from utils.search_index import text_hash
+from utils.vector_library import sync_document
+
+# Configuración de formatos soportados
+SUPPORTED_FORMATS = {
+    "pdf": ("PDF", ".pdf"),
+    "docx": ("Word", ".docx"),
+    "doc": ("Word", ".doc"),
+    "epub": ("EPub", ".epub"),
+    "txt": ("Text", ".txt"),
+    "html": ("HTML", ".html"),
+    "pptx": ("PowerPoint", ".pptx"),
+    "ppt": ("PowerPoint", ".ppt")
+}
+
+# Etapas de una ingesta, en orden
+STAGES = ("load", "split", "embed", "persist")
+
+# Tamaño de bloque al copiar y hashear archivos
+BLOCK_SIZE = 1024 * 1024
+
+# "stream" procesa página a página con memoria acotada; "batch" carga
+# el documento completo antes de dividirlo
+INGESTION_MODE = os.environ.get("YACHANI_INGESTION_MODE", "stream")
+
+# Fragmentos que se embeben y escriben juntos en modo streaming
+STREAM_WINDOW_CHUNKS = int(os.environ.get("YACHANI_STREAM_WINDOW_CHUNKS", 256))
+
+# Quitar líneas de plantilla y fragmentos casi duplicados al ingerir
+DEDUP_ENABLED = os.environ.get("YACHANI_DEDUP", "1") != "0"
+
+ProgressCallback = Callable[[str, float], None]
+
+
+def ensure_dir(path):
+    """Asegura que un directorio exista."""
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def clean_filename(filename):
+    """Limpia el nombre del archivo para que sea seguro."""
+    return "".join(c if c.isalnum() or c in "._- " else "_" for c in filename)
+
+
+def file_sha256(path: str) -> str:
+    """sha256 del contenido de un archivo, leído por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def clean_text_with_ai(text: str, llm) -> str:
+    """Usa IA para limpiar y estructurar mejor el texto."""
+    try:
+        prompt = f"""Por favor, limpia y estructura el siguiente texto manteniendo toda la información importante:
+        1. Elimina caracteres extraños y formato innecesario
+        2. Corrige errores obvios de formato
+        3. Mantén la estructura de párrafos y secciones
+        4. No agregues ni modifiques el contenido
+        5. Asegura que el texto sea coherente y legible
+
+        Texto: {text[:1500]}  # Limitamos para no usar muchos tokens
+        """
+
+        response = llm.invoke(prompt)
+        return response.content
+    except Exception as e:
+        print(f"Error cleaning text with AI: {str(e)}")
+        return text
+
+
+def create_preview_image(file_path: str, output_path: str, file_type: str):
+    """Crea una imagen de vista previa del documento."""
+    try:
+        if file_type == "pdf":
+            doc = fitz.open(file_path)
+            page = doc[0]
+            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+            pix.save(output_path)
+            doc.close()
+        elif file_type in ["ppt", "pptx"]:
+            prs = Presentation(file_path)
+            if len(prs.slides) > 0:
+                slide = prs.slides[0]
+                # Guardar la primera diapositiva como imagen
+                # Nota: Esto requeriría una implementación adicional
+                return False
+        return True
+    except Exception as e:
+        print(f"Error creating preview: {str(e)}")
+        return False
+
+
+def get_document_loader(file_path: str, file_type: str):
+    """Retorna el loader apropiado según el tipo de archivo."""
+    return get_loader(file_path, file_type)
+
+
+def _reporter(progress_callback: Optional[ProgressCallback]) -> ProgressCallback:
+    def report(stage: str, value: float):
+        if progress_callback:
+            progress_callback(stage, value)
+    return report
+
+
+def _text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=150,
+        separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""],
+        length_function=len
+    )
+
+
+def document_dir(content_hash: str) -> str:
+    """Directorio de un documento, direccionado por contenido.
+
+    Con un backend de embeddings distinto del original el nombre lleva
+    el backend, para no mezclar vectores de espacios distintos.
+    """
+    backend = backend_name()
+    name = content_hash if backend == LEGACY_BACKEND else f"{content_hash}.{backend}"
+    return os.path.join("data", "processed_docs", name)
+
+
+def _prepare_document(file_path: str, filename: str, metadata: Dict,
+                      content_hash: Optional[str], move_original: bool) -> Dict:
+    """Detectar duplicados y colocar el original en su directorio.
+
+    Con `move_original` el archivo (una subida propia) se mueve en lugar
+    de copiarse. Si un intento anterior ya lo movió, se reutiliza.
+    """
+    file_extension = Path(filename).suffix.lower()[1:]
+    content_hash = content_hash or file_sha256(file_path)
+
+    # Un archivo idéntico ya procesado con el mismo backend reutiliza su
+    # vectorstore
+    existing = get_document_manager().find_by_content_hash(content_hash)
+    if (existing and os.path.exists(existing.get('vectorstore_path', ''))
+            and read_backend_marker(existing['vectorstore_path'])["backend"] == backend_name()):
+        return {
+            "success": True,
+            "deduplicated": True,
+            "duplicate_of": existing['title'],
+            "content_hash": content_hash,
+            "num_pages": existing.get('pages', 0),
+            "num_chunks": existing.get('chunks', 0),
+            "vectorstore_path": existing['vectorstore_path'],
+            "original_path": existing['original_path'],
+            "preview_path": existing.get('preview_path'),
+            "file_type": file_extension,
+            "file_size": os.path.getsize(file_path)
+        }
+
+    # Directorio direccionado por contenido: no puede colisionar
+    doc_dir = ensure_dir(document_dir(content_hash))
+    return {
+        "success": True,
+        "deduplicated": False,
+        "content_hash": content_hash,
+        **_place_original(file_path, filename, metadata["title"], doc_dir, move_original)
+    }
+
+
+def _place_original(file_path: str, filename: str, title: str, doc_dir: str,
+                    move_original: bool) -> Dict:
+    """Guardar el original y su vista previa en el directorio del documento."""
+    file_extension = Path(filename).suffix.lower()[1:]
+    safe_title = clean_filename(title)
+
+    original_path = os.path.join(doc_dir, f"original_{safe_title}{Path(filename).suffix}")
+    if not os.path.exists(original_path):
+        if move_original:
+            shutil.move(file_path, original_path)
+        else:
+            shutil.copy2(file_path, original_path)
+
+    preview_path = os.path.join(doc_dir, f"{safe_title}_preview.png")
+    preview_created = create_preview_image(original_path, preview_path, file_extension)
+
+    return {
+        "vectorstore_path": doc_dir,
+        "original_path": original_path,
+        "preview_path": preview_path if preview_created else None,
+        "file_type": file_extension,
+        "file_size": os.path.getsize(original_path)
+    }
+
+
+def chunk_id(chunk) -> str:
+    """Id de un fragmento en Chroma: hash de su texto normalizado.
+
+    Así un fragmento sin cambios conserva su id entre versiones de un
+    documento y los reintentos sobrescriben en lugar de duplicar.
+    """
+    return text_hash(chunk.page_content)
+
+
+def unique_chunks(chunks: List, seen: Optional[Set[str]] = None,
+                  near_duplicates: Optional[NearDuplicateFilter] = None,
+                  dedup_stats: Optional[Dict[str, int]] = None) -> Tuple[List, List[str]]:
+    """Descartar fragmentos repetidos y retornar (fragmentos, ids).
+
+    Con `near_duplicates` también se descartan los casi duplicados; lo
+    eliminado se suma en `dedup_stats`.
+    """
+    seen = set() if seen is None else seen
+    dedup_stats = empty_dedup_stats() if dedup_stats is None else dedup_stats
+    kept, ids = [], []
+    for chunk in chunks:
+        key = chunk_id(chunk)
+        if key in seen:
+            dedup_stats["exact_duplicate_chunks"] += 1
+        elif near_duplicates is not None and near_duplicates.is_duplicate(chunk.page_content):
+            dedup_stats["near_duplicate_chunks"] += 1
+        else:
+            seen.add(key)
+            kept.append(chunk)
+            ids.append(key)
+    return kept, ids
+
+
+def _near_duplicate_filter() -> Optional[NearDuplicateFilter]:
+    return NearDuplicateFilter() if DEDUP_ENABLED else None
+
+
+def extract_document(file_path: str, filename: str, metadata: Dict,
+                     progress_callback: Optional[ProgressCallback] = None,
+                     content_hash: Optional[str] = None,
+                     clean_sample: bool = True,
+                     move_original: bool = False) -> Dict:
+    """Etapas de carga y división de un archivo ya guardado en disco.
+
+    Retorna el resultado parcial con los fragmentos en `chunks`, o el
+    resultado final si el archivo ya estaba en la biblioteca.
+    """
+    report = _reporter(progress_callback)
+
+    try:
+        # Determinar tipo de archivo
+        if Path(filename).suffix.lower()[1:] not in SUPPORTED_FORMATS:
+            return {"success": False, "error": "Formato de archivo no soportado"}
+
+        result = _prepare_document(file_path, filename, metadata, content_hash, move_original)
+        if result["deduplicated"]:
+            return result
+
+        # Etapa 1: cargar el documento
+        report("load", 0.0)
+        loader = get_document_loader(result["original_path"], result["file_type"])
+        dedup_stats = empty_dedup_stats()
+        documents = loader.load()
+        if DEDUP_ENABLED:
+            documents = list(strip_boilerplate(documents, dedup_stats))
+        report("load", 1.0)
+
+        # Limpiar texto con IA (muestra)
+        cleaned_sample = None
+        if documents and clean_sample:
+            llm = ChatOpenAI(temperature=0, max_tokens=500)
+            cleaned_sample = clean_text_with_ai(documents[0].page_content[:1500], llm)
+
+        # Etapa 2: dividir en chunks
+        report("split", 0.0)
+        chunks, _ = unique_chunks(
+            _text_splitter().split_documents(documents),
+            near_duplicates=_near_duplicate_filter(),
+            dedup_stats=dedup_stats
+        )
+        report("split", 1.0)
+
+        return {
+            **result,
+            "num_pages": len(documents),
+            "num_chunks": len(chunks),
+            "cleaned_sample": cleaned_sample,
+            "dedup_stats": dedup_stats,
+            "chunks": chunks
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+def _count_pages(path: str, file_type: str) -> Optional[int]:
+    """Número de páginas que producirá el loader, sin cargar el texto.
+
+    Es exacto en PDF y PPTX (una por diapositiva) y aproximado en texto
+    plano (bloques de TEXT_BLOCK_CHARS); los demás formatos se cargan
+    como un único documento.
+    """
+    try:
+        if file_type == "pdf":
+            with fitz.open(path) as document:
+                return document.page_count
+        if file_type == "pptx":
+            return max(1, len(Presentation(path).slides))
+        if file_type == "txt":
+            return max(1, -(-os.path.getsize(path) // TEXT_BLOCK_CHARS))
+        return 1
+    except Exception:
+        return None
+
+
+def _index_pages(vectorstore: Chroma, lexical_index: LexicalIndex, loader,
+                 report: ProgressCallback, total_pages: Optional[int], window_size: int,
+                 existing_ids: Optional[Set[str]] = None,
+                 clean_sample: bool = False) -> Dict:
+    """Dividir las páginas al llegar y escribir los fragmentos por ventanas
+    en el vectorstore y en el índice léxico.
+
+    Los fragmentos cuyo id ya está en `existing_ids` no se vuelven a
+    embeber: solo se actualiza su metadata (p. ej. el número de página).
+    """
+    existing_ids = existing_ids or set()
+    batched = getattr(vectorstore.embeddings, "underlying", None)
+    if not isinstance(batched, BatchedEmbeddings):
+        batched = None
+    text_splitter = _text_splitter()
+    near_duplicates = _near_duplicate_filter()
+    seen: Set[str] = set()
+    stats = {
+        "num_pages": 0, "added": 0, "kept": 0, "cleaned_sample": None,
+        "dedup_stats": empty_dedup_stats()
+    }
+    # Tiempo y lotes del embedder (solo la API, sin extracción ni escritura)
+    embedded = {"chunks": 0, "batches": 0, "seconds": 0.0, "rate_limit_retries": 0}
+    window = []
+    # Fracción del documento cubierta por las ventanas ya escritas
+    written = 0.0
+
+    def read_fraction() -> float:
+        # El total de texto plano es aproximado: no se llega a 1 antes de terminar
+        return min(stats["num_pages"] / total_pages, 0.99) if total_pages else 0.0
+
+    def flush(end: float):
+        nonlocal window, written
+        start = written
+        chunks, ids = unique_chunks(window, seen, near_duplicates, stats["dedup_stats"])
+        window = []
+        added = [(chunk, key) for chunk, key in zip(chunks, ids) if key not in existing_ids]
+        kept = [(chunk, key) for chunk, key in zip(chunks, ids) if key in existing_ids]
+        if added:
+            if batched:
+                # Avance real dentro de la ventana, por lotes embebidos
+                batched.last_stats = {}
+                batched.progress_callback = lambda done, total, rate: report(
+                    "embed", start + (end - start) * done / total
+                )
+            vectorstore.add_documents(
+                [chunk for chunk, _ in added],
+                ids=[key for _, key in added]
+            )
+            if batched and batched.last_stats:
+                for key in embedded:
+                    embedded[key] += batched.last_stats[key]
+                embedded["concurrency_limit"] = batched.last_stats["concurrency_limit"]
+        if kept:
+            vectorstore._collection.update(
+                ids=[key for _, key in kept],
+                metadatas=[chunk.metadata for chunk, _ in kept]
+            )
+        lexical_index.add(chunks, ids)
+        stats["added"] += len(added)
+        stats["kept"] += len(kept)
+        written = end
+        report("embed", end)
+        report("persist", end)
+
+    report("load", 0.0)
+    pages = loader.lazy_load()
+    if DEDUP_ENABLED:
+        pages = strip_boilerplate(pages, stats["dedup_stats"])
+    for page in pages:
+        if stats["num_pages"] == 0 and clean_sample:
+            llm = ChatOpenAI(temperature=0, max_tokens=500)
+            stats["cleaned_sample"] = clean_text_with_ai(page.page_content[:1500], llm)
+        stats["num_pages"] += 1
+        report("load", read_fraction())
+
+        window.extend(text_splitter.split_documents([page]))
+        report("split", read_fraction())
+        if len(window) >= window_size:
+            flush(read_fraction())
+    report("load", 1.0)
+    report("split", 1.0)
+    flush(1.0)
+    if batched:
+        batched.progress_callback = None
+
+    stats["num_chunks"] = len(seen)
+    stats["seen_ids"] = seen
+    if batched:
+        stats["embedding_stats"] = {
+            **embedded,
+            "chunks_per_second": embedded["chunks"] / embedded["seconds"] if embedded["seconds"] else 0.0
+        }
+    return stats
+
+
+def stream_document(file_path: str, filename: str, metadata: Dict,
+                    progress_callback: Optional[ProgressCallback] = None,
+                    content_hash: Optional[str] = None,
+                    clean_sample: bool = True,
+                    move_original: bool = False,
+                    embeddings: Optional[CachedEmbeddings] = None,
+                    window_size: Optional[int] = None) -> Dict:
+    """Procesar un documento página a página con memoria acotada.
+
+    Las páginas se cargan de forma perezosa, se dividen al llegar y los
+    fragmentos se embeben y escriben en ventanas de `window_size`, así
+    que nunca hay más de una ventana en memoria.
+    """
+    report = _reporter(progress_callback)
+
+    try:
+        if Path(filename).suffix.lower()[1:] not in SUPPORTED_FORMATS:
+            return {"success": False, "error": "Formato de archivo no soportado"}
+
+        result = _prepare_document(file_path, filename, metadata, content_hash, move_original)
+        if result["deduplicated"]:
+            return result
+
+        if embeddings is None:
+            embeddings = get_ingestion_embeddings()
+        before = embeddings.stats()
+        vectorstore = Chroma(
+            persist_directory=result["vectorstore_path"],
+            embedding_function=embeddings
+        )
+        stats = _index_pages(
+            vectorstore,
+            LexicalIndex(result["vectorstore_path"]),
+            get_document_loader(result["original_path"], result["file_type"]),
+            report,
+            _count_pages(result["original_path"], result["file_type"]),
+            window_size or STREAM_WINDOW_CHUNKS,
+            clean_sample=clean_sample
+        )
+        write_backend_marker(result["vectorstore_path"], embeddings)
+        report("persist", 1.0)
+
+        after = embeddings.stats()
+        result = {
+            **result,
+            "num_pages": stats["num_pages"],
+            "num_chunks": stats["num_chunks"],
+            "cleaned_sample": stats["cleaned_sample"],
+            "dedup_stats": stats["dedup_stats"],
+            "embedding_cache": {key: after[key] - before[key] for key in after}
+        }
+        if "embedding_stats" in stats:
+            result["embedding_stats"] = stats["embedding_stats"]
+        return result
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+def reindex_document(doc_hash: str, file_path: str, filename: str,
+                     progress_callback: Optional[ProgressCallback] = None,
+                     content_hash: Optional[str] = None,
+                     move_original: bool = False,
+                     window_size: Optional[int] = None) -> Dict:
+    """Reemplazar un documento por una nueva versión reutilizando sus vectores.
+
+    El vectorstore actual se copia al directorio de la nueva versión y se
+    compara por id (hash del texto) de fragmento: se eliminan los que ya
+    no existen, se embeben solo los nuevos y se conservan los demás. La
+    metadata del documento se actualiza en sitio.
+    """
+    report = _reporter(progress_callback)
+    doc_manager = get_document_manager()
+
+    try:
+        doc = doc_manager.get_document(doc_hash)
+        if doc is None:
+            return {"success": False, "error": "Documento no encontrado"}
+        if Path(filename).suffix.lower()[1:] not in SUPPORTED_FORMATS:
+            return {"success": False, "error": "Formato de archivo no soportado"}
+
+        content_hash = content_hash or file_sha256(file_path)
+        same_backend = read_backend_marker(doc['vectorstore_path'])["backend"] == backend_name()
+        if content_hash == doc.get('content_hash') and same_backend:
+            return {
+                "success": True,
+                "deduplicated": True,
+                "duplicate_of": doc['title'],
+                "doc_hash": doc_hash,
+                "content_hash": content_hash,
+                "num_pages": doc.get('pages', 0),
+                "num_chunks": doc.get('chunks', 0),
+                "vectorstore_path": doc['vectorstore_path'],
+                "original_path": doc['original_path'],
+                "preview_path": doc.get('preview_path'),
+                "file_type": doc.get('file_type'),
+                "file_size": doc.get('file_size', 0),
+                "reindex_stats": {"added": 0, "removed": 0, "kept": doc.get('chunks', 0)}
+            }
+
+        old_dir = doc['vectorstore_path']
+        new_dir = document_dir(content_hash)
+        embeddings = get_ingestion_embeddings()
+
+        # Copiar el vectorstore (sin original ni vista previa) para no
+        # alterar el directorio que otros documentos podrían compartir.
+        # Si se creó con otro backend de embeddings se reindexa completo.
+        if not os.path.exists(new_dir):
+            if backend_matches(old_dir, embeddings):
+                shutil.copytree(
+                    old_dir, new_dir,
+                    ignore=shutil.ignore_patterns("original_*", "*_preview.png")
+                )
+            else:
+                ensure_dir(new_dir)
+        result = {
+            "success": True,
+            "deduplicated": False,
+            "content_hash": content_hash,
+            **_place_original(file_path, filename, doc['title'], new_dir, move_original)
+        }
+
+        before = embeddings.stats()
+        vectorstore = Chroma(persist_directory=new_dir, embedding_function=embeddings)
+        existing_ids = set(vectorstore.get(include=[])["ids"])
+        lexical_index = LexicalIndex(new_dir)
+
+        stats = _index_pages(
+            vectorstore,
+            lexical_index,
+            get_document_loader(result["original_path"], result["file_type"]),
+            report,
+            _count_pages(result["original_path"], result["file_type"]),
+            window_size or STREAM_WINDOW_CHUNKS,
+            existing_ids=existing_ids
+        )
+
+        # Eliminar los fragmentos que desaparecieron en la nueva versión
+        removed = sorted(existing_ids - stats["seen_ids"])
+        for start in range(0, len(removed), STREAM_WINDOW_CHUNKS):
+            vectorstore.delete(ids=removed[start:start + STREAM_WINDOW_CHUNKS])
+        lexical_index.delete(removed)
+        write_backend_marker(new_dir, embeddings)
+        report("persist", 1.0)
+
+        after = embeddings.stats()
+        result.update({
+            "doc_hash": doc_hash,
+            "num_pages": stats["num_pages"],
+            "num_chunks": stats["num_chunks"],
+            "dedup_stats": stats["dedup_stats"],
+            "reindex_stats": {
+                "added": stats["added"],
+                "removed": len(removed),
+                "kept": stats["kept"]
+            },
+            "embedding_cache": {key: after[key] - before[key] for key in after}
+        })
+        if "embedding_stats" in stats:
+            result["embedding_stats"] = stats["embedding_stats"]
+
+        doc_manager.update_document(doc_hash, {
+            "content_hash": content_hash,
+            "pages": result["num_pages"],
+            "chunks": result["num_chunks"],
+            "vectorstore_path": new_dir,
+            "original_path": result["original_path"],
+            "preview_path": result["preview_path"],
+            "file_type": result["file_type"],
+            "file_size": result["file_size"],
+            "reindex_stats": result["reindex_stats"],
+            "dedup_stats": result["dedup_stats"]
+        })
+        sync_document(doc_manager.get_document(doc_hash))
+
+        # El directorio anterior se borra si ningún otro documento lo usa
+        still_used = any(
+            other.get('vectorstore_path') == old_dir
+            for other in doc_manager.iter_documents()
+        )
+        if old_dir != new_dir and not still_used:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+        return result
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+def write_document(extracted: Dict, progress_callback: Optional[ProgressCallback] = None,
+                   embeddings: Optional[CachedEmbeddings] = None) -> Dict:
+    """Etapas de embedding y escritura del vectorstore.
+
+    `embeddings` permite compartir una misma caché entre varios documentos.
+    """
+    if not extracted["success"] or extracted["deduplicated"]:
+        return extracted
+
+    report = _reporter(progress_callback)
+    result = dict(extracted)
+    chunks = result.pop("chunks")
+
+    try:
+        # Etapa 3: embeber (solo los fragmentos que no están en caché, en
+        # lotes por tokens enviados en paralelo)
+        report("embed", 0.0)
+        if embeddings is None:
+            embeddings = get_ingestion_embeddings()
+        batched = embeddings.underlying
+        if isinstance(batched, BatchedEmbeddings):
+            batched.progress_callback = lambda done, total, rate: report("embed", done / total)
+        before = embeddings.stats()
+        embeddings.embed_documents([chunk.page_content for chunk in chunks])
+        after = embeddings.stats()
+        report("embed", 1.0)
+
+        # Etapa 4: escribir el vectorstore; los vectores ya están en caché,
+        # así que esta etapa no vuelve a llamar a la API
+        report("persist", 0.0)
+        ids = [chunk_id(chunk) for chunk in chunks]
+        Chroma.from_documents(
+            documents=chunks,
+            embedding=embeddings,
+            ids=ids,
+            persist_directory=result["vectorstore_path"]
+        )
+        LexicalIndex(result["vectorstore_path"]).add(chunks, ids)
+        write_backend_marker(result["vectorstore_path"], embeddings)
+        report("persist", 1.0)
+
+        result["embedding_cache"] = {
+            key: after[key] - before[key] for key in after
+        }
+        if isinstance(batched, BatchedEmbeddings):
+            result["embedding_stats"] = batched.last_stats
+        return result
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
+def process_document(file_path: str, filename: str, metadata: Dict,
+                     progress_callback: Optional[ProgressCallback] = None,
+                     content_hash: Optional[str] = None,
+                     move_original: bool = False) -> Dict:
+    """Procesa un archivo ya guardado en disco y crea su vectorstore.
+
+    `progress_callback(etapa, fracción)` se invoca al avanzar cada etapa
+    de STAGES.
+    """
+    if INGESTION_MODE == "stream":
+        return stream_document(
+            file_path, filename, metadata, progress_callback, content_hash,
+            move_original=move_original
+        )
+    extracted = extract_document(
+        file_path, filename, metadata, progress_callback, content_hash,
+        move_original=move_original
+    )
+    return write_document(extracted, progress_callback)
+
+
+def register_document(metadata: Dict, result: Dict) -> str:
+    """Registrar en la biblioteca un documento ya procesado.
+
+    Si la colección compartida está activa, sus vectores se copian ahí.
+    """
+    doc_manager = get_document_manager()
+    doc_hash = doc_manager.add_document(
+        {
+            **metadata,
+            "content_hash": result["content_hash"],
+            "pages": result["num_pages"],
+            "chunks": result["num_chunks"],
+            "preview_path": result["preview_path"],
+            "file_type": result["file_type"],
+            "file_size": result["file_size"],
+            "dedup_stats": result.get("dedup_stats")
+        },
+        result["vectorstore_path"],
+        result["original_path"]
+    )
+    sync_document(doc_manager.get_document(doc_hash))
+    return doc_hash
+
+
+def ingest_document(file_path: str, filename: str, metadata: Dict,
+                    progress_callback: Optional[ProgressCallback] = None,
+                    content_hash: Optional[str] = None,
+                    move_original: bool = False) -> Dict:
+    """Procesar un archivo y registrarlo en la biblioteca.
+
+    Retorna el resultado de `process_document` con el `doc_hash` asignado.
+    """
+    result = process_document(
+        file_path, filename, metadata, progress_callback, content_hash, move_original
+    )
+    if not result["success"]:
+        return result
+
+    try:
+        result["doc_hash"] = register_document(metadata, result)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    return result
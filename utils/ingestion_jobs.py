@@ -0,0 +1,311 @@
+# utils/ingestion_jobs.py
+"""Cola persistente de ingestas procesada por procesos trabajadores.
+
+Uso: python -m utils.ingestion_jobs --workers 2
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from utils.file_storage import file_lock
+
+JOBS_DB_FILE = os.path.join("data", "jobs.sqlite3")
+UPLOAD_DIR = os.path.join("data", "uploads")
+WORKERS_LOCK = JOBS_DB_FILE + ".workers"
+
+# Procesos trabajadores que la aplicación lanza (0 = se lanzan aparte)
+INGESTION_WORKERS = int(os.environ.get("YACHANI_INGESTION_WORKERS", 2))
+
+# Segundos sin latido tras los que un trabajo en curso se da por abandonado
+STALE_SECONDS = 60
+HEARTBEAT_SECONDS = 10
+POLL_SECONDS = 1.0
+MAX_ATTEMPTS = 3
+
+_supervisor: Optional[subprocess.Popen] = None
+_supervisor_lock = threading.Lock()
+
+
+@contextmanager
+def _connect(db_file: str = JOBS_DB_FILE):
+    os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_file, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress REAL NOT NULL DEFAULT 0,
+                stages TEXT,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                heartbeat_at REAL
+            )
+        """)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "stages" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN stages TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        yield conn
+    finally:
+        conn.close()
+
+
+def _row_to_job(row) -> Dict:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["stages"] = json.loads(job["stages"]) if job["stages"] else {}
+    return job
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def job_upload_dir(job_id: str) -> str:
+    """Directorio donde se guarda el archivo subido de un trabajo."""
+    return os.path.join(UPLOAD_DIR, job_id)
+
+
+def enqueue_job(payload: Dict, kind: str = "ingest", job_id: Optional[str] = None) -> str:
+    """Registrar un trabajo pendiente y retornar su id."""
+    job_id = job_id or new_job_id()
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) "
+            "VALUES (?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, json.dumps(payload, ensure_ascii=False), now, now)
+        )
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """Obtener el estado de un trabajo."""
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
+
+
+def _requeue_stale_jobs(conn) -> None:
+    """Devolver a la cola los trabajos cuyo trabajador dejó de latir."""
+    now = time.time()
+    conn.execute(
+        "UPDATE jobs SET status = 'failed', error = 'Demasiados intentos fallidos', updated_at = ? "
+        "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+        (now, now - STALE_SECONDS, MAX_ATTEMPTS)
+    )
+    conn.execute(
+        "UPDATE jobs SET status = 'queued', updated_at = ? "
+        "WHERE status = 'running' AND heartbeat_at < ?",
+        (now, now - STALE_SECONDS)
+    )
+
+
+def claim_next_job() -> Optional[Dict]:
+    """Tomar el trabajo pendiente más antiguo y marcarlo como en curso."""
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _requeue_stale_jobs(conn)
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                "updated_at = ?, heartbeat_at = ? WHERE id = ?",
+                (now, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return get_job(row["id"])
+
+
+def update_job_progress(job_id: str, stage: str, progress: float) -> None:
+    """Registrar la etapa y el avance (0-1) de un trabajo en curso.
+
+    En modo streaming las etapas avanzan a la vez; `stages` guarda el
+    avance de cada una y `stage`/`progress` la última informada.
+    """
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET stage = ?, progress = ?, "
+            "stages = json_set(COALESCE(stages, '{}'), ?, ?), "
+            "updated_at = ?, heartbeat_at = ? WHERE id = ?",
+            (stage, progress, f"$.{stage}", progress, now, now, job_id)
+        )
+
+
+def heartbeat(job_id: str) -> None:
+    now = time.time()
+    with _connect() as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (now, job_id))
+
+
+def finish_job(job_id: str, result: Dict) -> None:
+    """Marcar un trabajo como terminado (o fallido, según `result`)."""
+    status = "done" if result.get("success") else "failed"
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (
+                status,
+                json.dumps(result, ensure_ascii=False),
+                result.get("error"),
+                time.time(),
+                job_id
+            )
+        )
+
+
+def _use_bundled_sqlite() -> None:
+    """Usar pysqlite3 para Chroma, como hacen las páginas de la aplicación."""
+    try:
+        import pysqlite3
+        sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+    except ImportError:
+        pass
+
+
+def run_job(job: Dict) -> Dict:
+    """Ejecutar un trabajo con latidos periódicos.
+
+    `kind` es "ingest" (documento nuevo) o "reindex" (nueva versión de un
+    documento existente, indicado en `payload["doc_hash"]`).
+    """
+    from utils.ingestion import ingest_document, reindex_document
+
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(HEARTBEAT_SECONDS):
+            heartbeat(job["id"])
+
+    beater = threading.Thread(target=beat, daemon=True)
+    beater.start()
+    try:
+        payload = job["payload"]
+        progress = lambda stage, value: update_job_progress(job["id"], stage, value)
+        # La subida es propia del trabajo: se mueve en lugar de copiarse
+        if job["kind"] == "reindex":
+            result = reindex_document(
+                payload["doc_hash"],
+                payload["file_path"],
+                payload["filename"],
+                progress_callback=progress,
+                content_hash=payload.get("content_hash"),
+                move_original=True
+            )
+        else:
+            result = ingest_document(
+                payload["file_path"],
+                payload["filename"],
+                payload["metadata"],
+                progress_callback=progress,
+                content_hash=payload.get("content_hash"),
+                move_original=True
+            )
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    finally:
+        stop.set()
+        beater.join()
+
+    finish_job(job["id"], result)
+    # El original ya se copió a processed_docs
+    shutil.rmtree(job_upload_dir(job["id"]), ignore_errors=True)
+    return result
+
+
+def worker_loop(supervisor_pid: int) -> None:
+    """Bucle de un proceso trabajador: tomar trabajos mientras viva el supervisor."""
+    _use_bundled_sqlite()
+    while os.getppid() == supervisor_pid:
+        job = claim_next_job()
+        if job is None:
+            time.sleep(POLL_SECONDS)
+            continue
+        run_job(job)
+
+
+def run_workers(workers: int) -> None:
+    """Mantener `workers` procesos trabajadores, reemplazando los que mueran.
+
+    Solo un supervisor puede estar activo a la vez; los demás terminan
+    de inmediato.
+    """
+    try:
+        with file_lock(WORKERS_LOCK, blocking=False):
+            context = multiprocessing.get_context("spawn")
+            processes = []
+            while True:
+                processes = [p for p in processes if p.is_alive()]
+                while len(processes) < workers:
+                    process = context.Process(target=worker_loop, args=(os.getpid(),))
+                    process.start()
+                    processes.append(process)
+                time.sleep(POLL_SECONDS)
+    except BlockingIOError:
+        print("Ingestion workers already running")
+
+
+def workers_running() -> bool:
+    """Saber si algún proceso tiene activo el supervisor de trabajadores."""
+    try:
+        with file_lock(WORKERS_LOCK, blocking=False):
+            return False
+    except BlockingIOError:
+        return True
+
+
+def ensure_workers() -> None:
+    """Lanzar el supervisor de trabajadores en segundo plano si no hay uno activo.
+
+    Se ejecuta como proceso independiente para que las ingestas sigan
+    aunque se cierre la pestaña o se reinicie la aplicación.
+    """
+    global _supervisor
+    if INGESTION_WORKERS <= 0:
+        return
+    with _supervisor_lock:
+        if _supervisor is not None and _supervisor.poll() is None:
+            return
+        if workers_running():
+            return
+        _supervisor = subprocess.Popen(
+            [sys.executable, "-m", "utils.ingestion_jobs", "--workers", str(INGESTION_WORKERS)],
+            start_new_session=True
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Procesar la cola de ingestas")
+    parser.add_argument("--workers", type=int, default=max(1, INGESTION_WORKERS))
+    args = parser.parse_args()
+    run_workers(args.workers)
@@ -0,0 +1,57 @@
+# utils/ingestion_stats.py
+from datetime import date, datetime
+from typing import Dict, Optional
+
+
+def day_key(day: date) -> str:
+    """Clave diaria del histograma (AAAA-MM-DD)."""
+    return day.isoformat()
+
+
+def week_key(day: date) -> str:
+    """Clave semanal ISO del histograma (AAAA-Www)."""
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def empty_stats() -> Dict:
+    """Histograma vacío de ingestas."""
+    return {
+        "daily": {},
+        "weekly": {},
+        "category_daily": {}
+    }
+
+
+def record_ingestion(stats: Dict, processed_date: datetime, category: Optional[str]) -> Dict:
+    """Sumar una ingesta a los contadores diario, semanal y por categoría."""
+    day = processed_date.date()
+    daily = stats.setdefault("daily", {})
+    weekly = stats.setdefault("weekly", {})
+    daily[day_key(day)] = daily.get(day_key(day), 0) + 1
+    weekly[week_key(day)] = weekly.get(week_key(day), 0) + 1
+
+    if category:
+        category_daily = stats.setdefault("category_daily", {}).setdefault(category, {})
+        category_daily[day_key(day)] = category_daily.get(day_key(day), 0) + 1
+    return stats
+
+
+def add_ingestion(categories: Dict, processed_date: datetime, category: Optional[str]) -> Dict:
+    """Sumar una ingesta al conteo por categoría y al histograma."""
+    counts = categories.setdefault('category_counts', {})
+    counts[category] = counts.get(category, 0) + 1
+    record_ingestion(categories.setdefault('ingestion_stats', {}), processed_date, category)
+    return categories
+
+
+def build_stats(metadata: Dict[str, Dict]) -> Dict:
+    """Reconstruir el histograma a partir de metadatos existentes."""
+    stats = empty_stats()
+    for doc in metadata.values():
+        try:
+            processed_date = datetime.fromisoformat(doc.get('processed_date', ''))
+        except (ValueError, TypeError):
+            continue
+        record_ingestion(stats, processed_date, doc.get('category'))
+    return stats
@@ -0,0 +1,293 @@
+# utils/lexical_index.py
+"""Índice BM25 de los fragmentos de cada documento.
+
+Se construye al ingerir, junto a los datos de Chroma del documento
+(`lexical_index.sqlite3`), y encuentra los términos exactos (nombres de
+funciones, fórmulas, títulos de capítulos) que la búsqueda por vectores
+suele perder.
+
+Construir el índice de documentos ya procesados:
+python -m utils.lexical_index build
+"""
+import os
+import re
+import sys
+import json
+import math
+import heapq
+import sqlite3
+import argparse
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from utils.search_index import normalize_chunk_text, tokenize
+
+LEXICAL_INDEX_FILE = "lexical_index.sqlite3"
+
+# Parámetros de BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Límite de parámetros por consulta de SQLite
+SQLITE_BATCH = 500
+
+# Frase entre comillas: se exige que aparezca tal cual
+QUOTED = re.compile(r'"([^"]+)"|“([^”]+)”')
+
+# Términos con pinta de código o fórmula: llamadas (`np.dot(`),
+# identificadores con guion bajo, nombres con puntos de al menos dos
+# letras por lado (`numpy.linspace`, no `a.b`), camelCase con dos o más
+# jorobas (`getElementById`, no `iPhone` ni `eBay`) y operadores entre
+# operandos (`x == y`, `a^2`, `std::vector`)
+CODE_LIKE = re.compile(
+    r"\b[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*\("
+    r"|\b[A-Za-z_]\w*_\w+"
+    r"|\b[A-Za-z_]\w+(?:\.[A-Za-z_]\w+)+"
+    r"|\b[a-z]{2,}(?:[A-Z][a-z0-9]+){2,}\b"
+    r"|\w+\s*(?:==|!=|<=|>=|->|::|\*\*|\^)\s*\w+"
+)
+
+
+def is_lexical_query(query: str) -> bool:
+    """Retorna True si la consulta busca términos exactos y basta el
+    índice léxico para responderla."""
+    return bool(QUOTED.search(query) or CODE_LIKE.search(query))
+
+
+def quoted_phrases(query: str) -> List[str]:
+    """Frases entre comillas de la consulta, normalizadas."""
+    return [
+        " ".join(tokenize(first or second))
+        for first, second in QUOTED.findall(query)
+        if tokenize(first or second)
+    ]
+
+
+def exact_terms(query: str) -> List[str]:
+    """Frases entre comillas y términos con pinta de código de la
+    consulta, normalizados como las frases."""
+    terms = quoted_phrases(query)
+    for match in CODE_LIKE.finditer(QUOTED.sub(" ", query)):
+        term = " ".join(tokenize(match.group(0)))
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _contains(normalized: str, phrase: str) -> bool:
+    """La frase aparece en el texto normalizado como tokens completos."""
+    return f" {phrase} " in f" {normalized} "
+
+
+class LexicalIndex:
+    """Índice invertido en SQLite de los fragmentos de un vectorstore."""
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, LEXICAL_INDEX_FILE)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    length INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, chunk_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id)")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def add(self, chunks: List, ids: List[str]) -> None:
+        """Agregar (o reemplazar) fragmentos con sus ids de Chroma."""
+        if not chunks:
+            return
+        with self._connect() as conn:
+            self._delete(conn, ids)
+            for chunk, chunk_id in zip(chunks, ids):
+                counts = Counter(tokenize(chunk.page_content))
+                conn.execute(
+                    "INSERT INTO chunks (id, content, metadata, length) VALUES (?, ?, ?, ?)",
+                    (chunk_id, chunk.page_content, json.dumps(chunk.metadata, default=str),
+                     sum(counts.values()))
+                )
+                conn.executemany(
+                    "INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)",
+                    [(term, chunk_id, tf) for term, tf in counts.items()]
+                )
+
+    def _delete(self, conn, ids: List[str]) -> None:
+        for start in range(0, len(ids), SQLITE_BATCH):
+            batch = ids[start:start + SQLITE_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            conn.execute(f"DELETE FROM chunks WHERE id IN ({placeholders})", batch)
+            conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+
+    def delete(self, ids: List[str]) -> None:
+        """Eliminar fragmentos por id."""
+        with self._connect() as conn:
+            self._delete(conn, ids)
+
+    def stats(self, terms: List[str]) -> Tuple[int, int, Dict[str, int]]:
+        """(fragmentos, longitud total, frecuencia de documento por término)."""
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks").fetchone()
+            rows = conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({','.join('?' * len(terms))}) "
+                f"GROUP BY term",
+                terms
+            ).fetchall()
+        return count, total, dict(rows)
+
+    def search(self, idf: Dict[str, float], avg_length: float, k: int) -> List[Dict]:
+        """Los k fragmentos con mayor puntuación BM25.
+
+        `idf` y `avg_length` vienen de las estadísticas combinadas de
+        todos los índices consultados, así las puntuaciones se pueden
+        comparar entre documentos.
+        """
+        terms = list(idf)
+        if not terms:
+            return []
+        scores: Dict[str, float] = {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT p.chunk_id, p.term, p.tf, c.length FROM postings p "
+                f"JOIN chunks c ON c.id = p.chunk_id WHERE p.term IN ({','.join('?' * len(terms))})",
+                terms
+            ).fetchall()
+            for chunk_id, term, tf, length in rows:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / max(avg_length, 1e-6))
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            results = []
+            for chunk_id, score in best:
+                content, metadata = conn.execute(
+                    "SELECT content, metadata FROM chunks WHERE id = ?", (chunk_id,)
+                ).fetchone()
+                results.append({
+                    "id": chunk_id,
+                    "content": content.strip(),
+                    "score": score,
+                    "metadata": json.loads(metadata)
+                })
+        return results
+
+
+def lexical_search(indexes: List[Dict], query: str, k: int,
+                   exact: bool = False) -> List[Dict]:
+    """BM25 sobre varios índices (`{"path", "title"}`) con estadísticas
+    globales; retorna el top-k en el mismo formato que la búsqueda por
+    vectores.
+
+    Si la consulta tiene frases entre comillas, solo cuentan los
+    fragmentos que las contienen; con `exact`, también los términos con
+    pinta de código.
+    """
+    terms = sorted(set(tokenize(query)))
+    opened = [(entry, LexicalIndex(entry["path"])) for entry in indexes]
+    opened = [(entry, index) for entry, index in opened if index.exists()]
+    if not terms or not opened:
+        return []
+
+    count, total, frequencies = 0, 0, Counter()
+    for _, index in opened:
+        index_count, index_total, index_frequencies = index.stats(terms)
+        count += index_count
+        total += index_total
+        frequencies.update(index_frequencies)
+    if not count:
+        return []
+    idf = {
+        term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+        for term, df in frequencies.items()
+    }
+
+    phrases = exact_terms(query) if exact else quoted_phrases(query)
+    # Con frases se piden más candidatos, porque algunos se descartan
+    limit = k * 5 if phrases else k
+    best: Dict[str, Dict] = {}
+    for entry, index in opened:
+        for hit in index.search(idf, total / count, limit):
+            normalized = " ".join(tokenize(hit["content"]))
+            if not all(_contains(normalized, phrase) for phrase in phrases):
+                continue
+            key = normalize_chunk_text(hit["content"])
+            if key not in best or best[key]["score"] < hit["score"]:
+                best[key] = {
+                    "content": hit["content"],
+                    "source": entry["title"],
+                    "score": hit["score"],
+                    "metadata": hit["metadata"]
+                }
+    return heapq.nlargest(k, best.values(), key=lambda result: result["score"])
+
+
+def build_from_vectorstore(directory: str) -> int:
+    """Construir el índice de un vectorstore existente con sus propios
+    fragmentos (sin volver a embeber). Retorna el número de fragmentos."""
+    from langchain_chroma import Chroma
+    from langchain_core.documents import Document
+
+    collection = Chroma(persist_directory=directory)._collection
+    index = LexicalIndex(directory)
+    built = 0
+    while True:
+        batch = collection.get(include=["documents", "metadatas"], limit=SQLITE_BATCH, offset=built)
+        if not batch["ids"]:
+            return built
+        index.add(
+            [
+                Document(page_content=content, metadata=metadata or {})
+                for content, metadata in zip(batch["documents"], batch["metadatas"])
+            ],
+            batch["ids"]
+        )
+        built += len(batch["ids"])
+
+
+if __name__ == "__main__":
+    try:
+        import pysqlite3
+        sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+    except ImportError:
+        pass
+
+    parser = argparse.ArgumentParser(description="Índices BM25 de los documentos")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser(
+        "build", help="Construir los índices que faltan a partir de los vectorstores"
+    )
+    build_parser.add_argument("--force", action="store_true",
+                              help="Reconstruir también los índices existentes")
+    args = parser.parse_args()
+
+    from utils.document_manager import get_document_manager
+
+    for path in sorted({doc.get('vectorstore_path', '') for doc in get_document_manager().iter_documents()}):
+        if not os.path.exists(path):
+            continue
+        index = LexicalIndex(path)
+        if index.exists() and not args.force:
+            continue
+        if index.exists():
+            os.remove(index.path)
+        print(f"Indexed {path} ({build_from_vectorstore(path)} chunks)")
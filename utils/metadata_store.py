@@ -0,0 +1,685 @@
+# utils/metadata_store.py
+import os
+import json
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from utils.file_storage import (
+    atomic_write_json,
+    file_lock,
+    notify_change,
+    read_change_version,
+    read_json,
+    update_json
+)
+from utils.ingestion_stats import add_ingestion
+from utils.search_index import document_tokens, sort_value, tokenize
+
+
+class MetadataStore:
+    """Base de los motores de metadatos.
+
+    Cada escritura incrementa un contador de cambios compartido en disco;
+    `signature()` lo lee para que las cachés de otros procesos sepan
+    cuándo recargar.
+    """
+
+    # True si el motor resuelve búsquedas, filtros y páginas por sí mismo
+    # y DocumentManager no necesita cargar la biblioteca en memoria
+    queryable = False
+
+    def __init__(self, change_file: str):
+        self.CHANGE_FILE = change_file
+
+    def signature(self) -> int:
+        """Versión actual de la biblioteca."""
+        return read_change_version(self.CHANGE_FILE)
+
+    def _notify(self) -> int:
+        return notify_change(self.CHANGE_FILE)
+
+    def count_ingestion(self, category: str, processed_date: datetime, default: Dict) -> int:
+        """Sumar una ingesta al conteo de categorías y al histograma."""
+        _, version = self.update_categories(
+            lambda categories: add_ingestion(categories, processed_date, category),
+            default
+        )
+        return version
+
+
+class JsonMetadataStore(MetadataStore):
+    """Almacenamiento de metadatos en archivos JSON completos."""
+
+    def __init__(self, metadata_file: str, categories_file: str, change_file: str):
+        super().__init__(change_file)
+        self.METADATA_FILE = metadata_file
+        self.CATEGORIES_FILE = categories_file
+
+    def load_metadata(self) -> Dict:
+        """Cargar o crear archivo de metadatos."""
+        if not os.path.exists(self.METADATA_FILE):
+            self.save_metadata({})
+            return {}
+        return read_json(self.METADATA_FILE, {})
+
+    def save_metadata(self, metadata: Dict) -> int:
+        """Guardar metadatos de forma atómica."""
+        with file_lock(self.METADATA_FILE):
+            atomic_write_json(self.METADATA_FILE, metadata)
+        return self._notify()
+
+    def put_document(self, doc_hash: str, record: Dict, metadata: Dict = None) -> int:
+        """Guardar un documento releyendo el archivo bajo bloqueo, para no
+        perder documentos agregados por otros procesos."""
+        def apply(current):
+            current[doc_hash] = record
+            return current
+
+        update_json(self.METADATA_FILE, apply, {})
+        return self._notify()
+
+    def load_categories(self) -> Optional[Dict]:
+        """Cargar categorías; None si no existen o están corruptas."""
+        return read_json(self.CATEGORIES_FILE, None)
+
+    def save_categories(self, categories: Dict) -> int:
+        """Guardar categorías de forma atómica."""
+        with file_lock(self.CATEGORIES_FILE):
+            atomic_write_json(self.CATEGORIES_FILE, categories)
+        return self._notify()
+
+    def update_categories(self, update_fn: Callable[[Dict], Dict], default: Dict) -> Tuple[Dict, int]:
+        """Leer-modificar-escribir las categorías bajo bloqueo."""
+        categories = update_json(
+            self.CATEGORIES_FILE,
+            lambda current: update_fn(current if current is not None else default),
+            None
+        )
+        return categories, self._notify()
+
+
+class JournalMetadataStore(JsonMetadataStore):
+    """Metadatos como snapshot JSON más un journal de solo anexado.
+
+    Cada mutación se agrega como una línea JSON al journal; al iniciar se
+    aplica el journal sobre el último snapshot. Cuando el journal supera
+    el umbral, un hilo en segundo plano lo compacta en un nuevo snapshot.
+
+    Las ingestas no reescriben categories.json: se anotan en un archivo
+    de contadores de solo anexado que la compactación incorpora al
+    snapshot de categorías.
+    """
+
+    # Clave del snapshot de categorías con el id del último lote incorporado
+    FOLDED_KEY = "folded_batch"
+
+    def __init__(self, metadata_file: str, categories_file: str, change_file: str,
+                 compact_threshold: int = 1024 * 1024):
+        super().__init__(metadata_file, categories_file, change_file)
+        self.JOURNAL_FILE = f"{os.path.splitext(metadata_file)[0]}.journal.jsonl"
+        self.COMPACTING_FILE = f"{self.JOURNAL_FILE}.compacting"
+        self.COUNTER_FILE = f"{os.path.splitext(categories_file)[0]}.journal.jsonl"
+        self.FOLDING_FILE = f"{self.COUNTER_FILE}.folding"
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+        self._compaction_thread = None
+        with file_lock(self.METADATA_FILE):
+            self._terminate_partial_line(self.JOURNAL_FILE)
+        with file_lock(self.CATEGORIES_FILE):
+            self._terminate_partial_line(self.COUNTER_FILE)
+
+    @staticmethod
+    def _terminate_partial_line(journal_file: str) -> None:
+        """Cerrar una línea truncada para que no se mezcle con la siguiente."""
+        try:
+            if os.path.getsize(journal_file) > 0:
+                with open(journal_file, 'rb+') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _read_entries(journal_file: str) -> List[Dict]:
+        """Leer las entradas válidas de un journal."""
+        entries = []
+        if not os.path.exists(journal_file):
+            return entries
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Última línea truncada por una caída durante la escritura
+                    print(f"Skipping corrupt entry in {journal_file}")
+        return entries
+
+    def _replay(self, metadata: Dict, journal_file: str) -> None:
+        """Aplicar las mutaciones de un journal sobre los metadatos."""
+        for entry in self._read_entries(journal_file):
+            if entry.get("op") == "put":
+                metadata[entry["hash"]] = entry["record"]
+            elif entry.get("op") == "delete":
+                metadata.pop(entry["hash"], None)
+
+    def load_metadata(self) -> Dict:
+        """Cargar el snapshot y aplicar los journals pendientes."""
+        with self._lock, file_lock(self.METADATA_FILE):
+            metadata = read_json(self.METADATA_FILE, {})
+            self._replay(metadata, self.COMPACTING_FILE)
+            self._replay(metadata, self.JOURNAL_FILE)
+        return metadata
+
+    def save_metadata(self, metadata: Dict) -> int:
+        """Reescribir el snapshot completo y vaciar el journal."""
+        with self._lock, file_lock(self.METADATA_FILE):
+            atomic_write_json(self.METADATA_FILE, metadata)
+            for journal_file in (self.COMPACTING_FILE, self.JOURNAL_FILE):
+                if os.path.exists(journal_file):
+                    os.remove(journal_file)
+        return self._notify()
+
+    def put_document(self, doc_hash: str, record: Dict, metadata: Dict = None) -> int:
+        """Agregar la mutación al journal (costo O(1) por documento)."""
+        line = json.dumps({"op": "put", "hash": doc_hash, "record": record}, ensure_ascii=False)
+        with self._lock, file_lock(self.METADATA_FILE):
+            with open(self.JOURNAL_FILE, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            journal_size = os.path.getsize(self.JOURNAL_FILE)
+        version = self._notify()
+
+        if journal_size >= self.compact_threshold:
+            self.compact_in_background()
+        return version
+
+    def compact_in_background(self) -> None:
+        """Lanzar la compactación en un hilo si no hay otra en curso."""
+        with self._lock:
+            if self._compaction_thread and self._compaction_thread.is_alive():
+                return
+            self._compaction_thread = threading.Thread(target=self.compact, daemon=True)
+            self._compaction_thread.start()
+
+    def compact(self) -> None:
+        """Incorporar el journal a un nuevo snapshot.
+
+        No cambia el contenido, así que no emite notificación de cambio.
+        """
+        try:
+            # Un solo compactador a la vez entre todos los procesos
+            with file_lock(self.COMPACTING_FILE):
+                # Rotar el journal: las nuevas escrituras van a un archivo nuevo
+                with self._lock, file_lock(self.METADATA_FILE):
+                    if not os.path.exists(self.COMPACTING_FILE):
+                        if not os.path.exists(self.JOURNAL_FILE):
+                            return
+                        os.replace(self.JOURNAL_FILE, self.COMPACTING_FILE)
+                    metadata = read_json(self.METADATA_FILE, {})
+
+                self._replay(metadata, self.COMPACTING_FILE)
+
+                with self._lock, file_lock(self.METADATA_FILE):
+                    atomic_write_json(self.METADATA_FILE, metadata)
+                    os.remove(self.COMPACTING_FILE)
+            self.compact_categories()
+        except Exception as e:
+            print(f"Error compacting metadata journal: {str(e)}")
+
+    @staticmethod
+    def _apply_counts(categories: Dict, entries: List[Dict]) -> None:
+        """Sumar las ingestas anotadas a las categorías."""
+        for entry in entries:
+            try:
+                processed_date = datetime.fromisoformat(entry["processed_date"])
+            except (KeyError, ValueError, TypeError):
+                continue
+            add_ingestion(categories, processed_date, entry.get("category"))
+
+    def _load_folded_categories(self) -> Optional[Dict]:
+        """Snapshot de categorías con los contadores pendientes (bajo bloqueo)."""
+        categories = read_json(self.CATEGORIES_FILE, None)
+        if categories is None:
+            return None
+        folded = categories.pop(self.FOLDED_KEY, None)
+        # Un lote ya incorporado cuya eliminación quedó a medias no se vuelve a sumar
+        pending = self._read_entries(self.FOLDING_FILE)
+        if pending and pending[0].get("id") != folded:
+            self._apply_counts(categories, pending)
+        self._apply_counts(categories, self._read_entries(self.COUNTER_FILE))
+        return categories
+
+    def _fold_counts(self) -> None:
+        """Incorporar los contadores al snapshot de categorías (bajo bloqueo).
+
+        El lote se rota antes de sumarlo y el snapshot guarda su id, de
+        modo que una caída entre la escritura y el borrado no lo duplica.
+        """
+        if not os.path.exists(self.FOLDING_FILE):
+            if not os.path.exists(self.COUNTER_FILE):
+                return
+            os.replace(self.COUNTER_FILE, self.FOLDING_FILE)
+        categories = read_json(self.CATEGORIES_FILE, None)
+        pending = self._read_entries(self.FOLDING_FILE)
+        if categories is not None and pending:
+            if categories.get(self.FOLDED_KEY) != pending[0].get("id"):
+                self._apply_counts(categories, pending)
+                categories[self.FOLDED_KEY] = pending[0].get("id")
+                atomic_write_json(self.CATEGORIES_FILE, categories)
+        os.remove(self.FOLDING_FILE)
+
+    def compact_categories(self) -> None:
+        """Incorporar los contadores de ingestas al snapshot de categorías."""
+        with file_lock(self.CATEGORIES_FILE):
+            self._fold_counts()
+
+    def load_categories(self) -> Optional[Dict]:
+        """Cargar el snapshot de categorías y sumar los contadores pendientes."""
+        with file_lock(self.CATEGORIES_FILE):
+            return self._load_folded_categories()
+
+    def save_categories(self, categories: Dict) -> int:
+        """Reemplazar las categorías descartando los contadores pendientes."""
+        with file_lock(self.CATEGORIES_FILE):
+            self._fold_counts()
+            atomic_write_json(self.CATEGORIES_FILE, categories)
+        return self._notify()
+
+    def update_categories(self, update_fn: Callable[[Dict], Dict], default: Dict) -> Tuple[Dict, int]:
+        """Leer-modificar-escribir las categorías con los contadores incorporados."""
+        with file_lock(self.CATEGORIES_FILE):
+            self._fold_counts()
+            current = self._load_folded_categories()
+            categories = update_fn(current if current is not None else default)
+            atomic_write_json(self.CATEGORIES_FILE, categories)
+        return categories, self._notify()
+
+    def count_ingestion(self, category: str, processed_date: datetime, default: Dict) -> int:
+        """Anotar la ingesta en el archivo de contadores (costo O(1))."""
+        line = json.dumps({
+            "id": uuid.uuid4().hex,
+            "category": category,
+            "processed_date": processed_date.isoformat()
+        }, ensure_ascii=False)
+        with file_lock(self.CATEGORIES_FILE):
+            if not os.path.exists(self.CATEGORIES_FILE):
+                atomic_write_json(self.CATEGORIES_FILE, default)
+            with open(self.COUNTER_FILE, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        return self._notify()
+
+
+class SqliteMetadataStore(MetadataStore):
+    """Almacenamiento de metadatos en SQLite (modo WAL).
+
+    Los campos filtrables y de orden se guardan en columnas indexadas y el
+    registro completo en una columna JSON. Cada escritura afecta solo a
+    una fila, y el modo WAL permite lecturas concurrentes desde varios
+    procesos. Búsquedas, filtros, conteos y páginas se resuelven con SQL,
+    sin cargar la biblioteca en memoria.
+    """
+
+    queryable = True
+
+    # Columnas de consulta: facetas, orden, deduplicación y texto buscable
+    COLUMNS = (
+        ("title", "TEXT"),
+        ("category", "TEXT"),
+        ("type", "TEXT"),
+        ("level", "TEXT"),
+        ("language", "TEXT"),
+        ("year", "INTEGER"),
+        ("processed_date", "TEXT"),
+        ("content_hash", "TEXT"),
+        ("search_text", "TEXT")
+    )
+
+    FACET_FIELDS = ("category", "type", "level", "language", "year")
+    SORT_FIELDS = ("processed_date", "title", "year")
+
+    # Cambia cuando cambia el contenido de las columnas de consulta
+    SCHEMA_VERSION = "2"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            hash TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS idx_documents_category ON documents(category);
+        CREATE INDEX IF NOT EXISTS idx_documents_type ON documents(type);
+        CREATE INDEX IF NOT EXISTS idx_documents_level ON documents(level);
+        CREATE INDEX IF NOT EXISTS idx_documents_language ON documents(language);
+        CREATE INDEX IF NOT EXISTS idx_documents_year ON documents(year, hash);
+        CREATE INDEX IF NOT EXISTS idx_documents_processed_date ON documents(processed_date, hash);
+        CREATE INDEX IF NOT EXISTS idx_documents_title ON documents(title, hash);
+        CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash);
+    """
+
+    def __init__(self, db_file: str, change_file: str, metadata_file: str = None, categories_file: str = None):
+        super().__init__(change_file)
+        self.DB_FILE = db_file
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            self._migrate_columns(conn)
+            conn.executescript(self.INDEXES)
+
+        # Migración única desde los archivos JSON existentes
+        if metadata_file or categories_file:
+            self.migrate_from_json(metadata_file, categories_file)
+
+    def _migrate_columns(self, conn) -> None:
+        """Agregar las columnas que falten y recalcularlas desde el JSON
+        (bases creadas por versiones anteriores)."""
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+        for column, column_type in self.COLUMNS:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE documents ADD COLUMN {column} {column_type}")
+        if self._get_setting(conn, "schema_version") == self.SCHEMA_VERSION:
+            return
+        for doc_hash, data in conn.execute("SELECT hash, data FROM documents").fetchall():
+            self._upsert(conn, doc_hash, json.loads(data))
+        self._set_setting(conn, "schema_version", self.SCHEMA_VERSION)
+
+    @contextmanager
+    def _connect(self):
+        """Abrir una conexión con commit/rollback automático."""
+        conn = sqlite3.connect(self.DB_FILE, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _row_values(self, doc_hash: str, record: Dict) -> tuple:
+        return (
+            doc_hash,
+            sort_value("title", record),
+            record.get('category'),
+            record.get('type'),
+            record.get('level'),
+            record.get('language'),
+            sort_value("year", record),
+            sort_value("processed_date", record),
+            record.get('content_hash'),
+            # Espacios a los lados para buscar tokens por prefijo con LIKE
+            f" {' '.join(sorted(document_tokens(record)))} ",
+            json.dumps(record, ensure_ascii=False)
+        )
+
+    def _upsert(self, conn, doc_hash: str, record: Dict) -> None:
+        conn.execute(
+            """
+            INSERT INTO documents (hash, title, category, type, level, language, year,
+                                   processed_date, content_hash, search_text, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(hash) DO UPDATE SET
+                title = excluded.title,
+                category = excluded.category,
+                type = excluded.type,
+                level = excluded.level,
+                language = excluded.language,
+                year = excluded.year,
+                processed_date = excluded.processed_date,
+                content_hash = excluded.content_hash,
+                search_text = excluded.search_text,
+                data = excluded.data
+            """,
+            self._row_values(doc_hash, record)
+        )
+
+    def _get_setting(self, conn, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_setting(self, conn, key: str, value: str) -> None:
+        conn.execute(
+            "INSERT INTO settings (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    def migrate_from_json(self, metadata_file: str = None, categories_file: str = None) -> int:
+        """Importar una sola vez los metadatos y categorías desde JSON."""
+        with self._lock, self._connect() as conn:
+            if self._get_setting(conn, "migrated_from_json"):
+                return 0
+
+            migrated = 0
+            if metadata_file and os.path.exists(metadata_file):
+                try:
+                    with open(metadata_file, 'r', encoding='utf-8') as f:
+                        metadata = json.load(f)
+                    for doc_hash, record in metadata.items():
+                        self._upsert(conn, doc_hash, record)
+                        migrated += 1
+                except json.JSONDecodeError:
+                    print(f"Error decoding {metadata_file}, skipping migration")
+
+            if categories_file and os.path.exists(categories_file):
+                if self._get_setting(conn, "categories") is None:
+                    try:
+                        with open(categories_file, 'r', encoding='utf-8') as f:
+                            self._set_setting(conn, "categories", f.read())
+                    except Exception as e:
+                        print(f"Error migrating categories: {str(e)}")
+
+            self._set_setting(conn, "migrated_from_json", "1")
+            return migrated
+
+    def load_metadata(self) -> Dict:
+        """Cargar todos los documentos."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT hash, data FROM documents").fetchall()
+        return {doc_hash: json.loads(data) for doc_hash, data in rows}
+
+    def save_metadata(self, metadata: Dict) -> int:
+        """Reemplazar todos los documentos."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM documents")
+            for doc_hash, record in metadata.items():
+                self._upsert(conn, doc_hash, record)
+        return self._notify()
+
+    def put_document(self, doc_hash: str, record: Dict, metadata: Dict = None) -> int:
+        """Guardar un único documento."""
+        with self._lock, self._connect() as conn:
+            self._upsert(conn, doc_hash, record)
+        return self._notify()
+
+    def get_document(self, doc_hash: str) -> Optional[Dict]:
+        """Leer un documento sin cargar la biblioteca completa."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM documents WHERE hash = ?", (doc_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_documents(self) -> Iterator[Dict]:
+        """Recorrer todos los documentos por lotes (tareas de mantenimiento)."""
+        after = ""
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT hash, data FROM documents WHERE hash > ? ORDER BY hash LIMIT 500",
+                    (after,)
+                ).fetchall()
+            if not rows:
+                return
+            for _, data in rows:
+                yield json.loads(data)
+            after = rows[-1][0]
+
+    def count_documents(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def find_by_content_hash(self, content_hash: str) -> Optional[Dict]:
+        """Un documento con ese hash de contenido de archivo."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM documents WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def facet_counts(self, field: str) -> Dict:
+        """Número de documentos por valor de un campo facetado."""
+        if field not in self.FACET_FIELDS:
+            raise ValueError(f"Campo de filtro no soportado: {field}")
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {field}, COUNT(*) FROM documents WHERE {field} IS NOT NULL GROUP BY {field}"
+            ).fetchall()
+        return dict(rows)
+
+    @staticmethod
+    def _where(query: Optional[str], filters: Optional[Dict]) -> Tuple[List[str], List]:
+        """Condiciones SQL de una búsqueda del catálogo.
+
+        Los filtros usan las columnas indexadas y cada término de la
+        consulta se resuelve por prefijo sobre los tokens normalizados,
+        igual que el índice invertido en memoria.
+        """
+        clauses, params = [], []
+        for key, value in (filters or {}).items():
+            if not value or value in ("Todas", "Todos"):
+                continue
+            if key == "year_range":
+                clauses.append("year BETWEEN ? AND ?")
+                params.extend([value[0], value[1]])
+            elif key in ("category", "type", "level", "language"):
+                clauses.append(f"{key} = ?")
+                params.append(value)
+            else:
+                clauses.append("json_extract(data, ?) = ?")
+                params.extend([f'$."{key}"', value])
+        for term in sorted(set(tokenize(query or ""))):
+            # Los tokens son \w+: solo el guion bajo es comodín de LIKE
+            escaped = term.replace("_", "\\_")
+            clauses.append("search_text LIKE ? ESCAPE '\\'")
+            params.append(f"% {escaped}%")
+        return clauses, params
+
+    def search_hashes(self, query: Optional[str] = None, filters: Optional[Dict] = None) -> Optional[Set[str]]:
+        """Hashes de los documentos que cumplen la búsqueda (None = todos)."""
+        clauses, params = self._where(query, filters)
+        if not clauses and not query:
+            return None
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT hash FROM documents {where}", params).fetchall()
+        return {doc_hash for doc_hash, in rows}
+
+    def search(self, query: Optional[str] = None, filters: Optional[Dict] = None) -> List[Dict]:
+        """Documentos que cumplen la búsqueda, los más recientes primero."""
+        clauses, params = self._where(query, filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT data FROM documents {where} ORDER BY processed_date DESC, hash DESC",
+                params
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def page(self, sort_key: str, page_size: int, after: Optional[tuple] = None,
+             descending: bool = False, members: Optional[Set[str]] = None) -> List[Tuple[tuple, Dict]]:
+        """Página de documentos que sigue a la clave `(valor, hash)` `after`.
+
+        Retorna pares (clave, documento) con la misma clave que
+        `SortedIndex`, así los cursores valen en ambos motores. Con
+        `members` se pagina solo ese subconjunto.
+        """
+        if sort_key not in self.SORT_FIELDS:
+            raise ValueError(f"Campo de orden no soportado: {sort_key}")
+        clauses, params = [], []
+        if after is not None:
+            clauses.append(f"({sort_key}, hash) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        direction = "DESC" if descending else "ASC"
+        with self._connect() as conn:
+            source = "documents"
+            if members is not None:
+                # Tabla temporal: el subconjunto puede superar el límite de parámetros
+                conn.execute("CREATE TEMP TABLE members (hash TEXT PRIMARY KEY)")
+                conn.executemany("INSERT OR IGNORE INTO members (hash) VALUES (?)",
+                                 [(doc_hash,) for doc_hash in members])
+                source = "documents JOIN members USING (hash)"
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            rows = conn.execute(
+                f"SELECT {sort_key}, hash, data FROM {source} {where} "
+                f"ORDER BY {sort_key} {direction}, hash {direction} LIMIT ?",
+                params + [page_size]
+            ).fetchall()
+        return [((value, doc_hash), json.loads(data)) for value, doc_hash, data in rows]
+
+    def load_categories(self) -> Optional[Dict]:
+        """Cargar categorías; None si no existen."""
+        with self._connect() as conn:
+            value = self._get_setting(conn, "categories")
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            print(f"Error decoding categories in {self.DB_FILE}")
+            return None
+
+    def save_categories(self, categories: Dict) -> int:
+        """Guardar categorías."""
+        with self._lock, self._connect() as conn:
+            self._set_setting(conn, "categories", json.dumps(categories, ensure_ascii=False))
+        return self._notify()
+
+    def update_categories(self, update_fn: Callable[[Dict], Dict], default: Dict) -> Tuple[Dict, int]:
+        """Leer-modificar-escribir las categorías en una transacción."""
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            value = self._get_setting(conn, "categories")
+            categories = update_fn(json.loads(value) if value is not None else default)
+            self._set_setting(conn, "categories", json.dumps(categories, ensure_ascii=False))
+        return categories, self._notify()
+
+
+def create_metadata_store(storage: str, base_dir: str):
+    """Crear el motor de almacenamiento de metadatos configurado."""
+    metadata_file = os.path.join(base_dir, "metadata.json")
+    categories_file = os.path.join(base_dir, "categories.json")
+    change_file = os.path.join(base_dir, ".library_version")
+
+    if storage == "json":
+        return JsonMetadataStore(metadata_file, categories_file, change_file)
+    if storage == "journal":
+        return JournalMetadataStore(
+            metadata_file,
+            categories_file,
+            change_file,
+            int(os.environ.get("YACHANI_JOURNAL_COMPACT_BYTES", 1024 * 1024))
+        )
+    if storage == "sqlite":
+        return SqliteMetadataStore(
+            os.path.join(base_dir, "metadata.sqlite3"),
+            change_file,
+            metadata_file,
+            categories_file
+        )
+    raise ValueError(f"Almacenamiento de metadatos no soportado: {storage}")
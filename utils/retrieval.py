@@ -0,0 +1,193 @@
+# utils/retrieval.py
+"""Búsqueda de un agente sobre todos sus vectorstores.
+
+La consulta se embebe una sola vez (con caché en memoria) y se busca por
+vector en todos los vectorstores en paralelo; los resultados se combinan
+en un top-k global por puntuación, en lugar de recorrerlos uno tras otro
+y cortar la lista concatenada.
+
+En modo híbrido la búsqueda BM25 corre a la vez y ambas listas se
+fusionan con reciprocal rank fusion. Las consultas de términos exactos
+(entre comillas o con pinta de código) se responden solo con BM25, sin
+llamar a la API de embeddings, cuando los fragmentos encontrados
+contienen esos términos.
+"""
+import os
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from utils.embeddings import embedding_model_name, query_embedding_cache
+from utils.lexical_index import is_lexical_query, lexical_search
+from utils.search_index import normalize_chunk_text
+
+# Vectorstores consultados a la vez
+RETRIEVAL_CONCURRENCY = int(os.environ.get("YACHANI_RETRIEVAL_CONCURRENCY", 8))
+
+# "hybrid" (BM25 + vectores) o "vector"
+RETRIEVAL_MODE = os.environ.get("YACHANI_RETRIEVAL_MODE", "hybrid")
+
+# Constante de reciprocal rank fusion
+RRF_K = 60
+
+
+def distance_to_relevance(distance: float, metric: str = "l2") -> float:
+    """Relevancia (mayor es mejor) de una distancia de Chroma.
+
+    Con `cosine` e `ip` Chroma retorna 1 - similitud; con `l2`, la
+    distancia euclídea al cuadrado, que se lleva a (0, 1].
+    """
+    if metric in ("cosine", "ip"):
+        return 1.0 - distance
+    return 1.0 / (1.0 + distance)
+
+
+def _search_store(vs: Dict, vector: List[float], k: int) -> Dict:
+    """Consultar un vectorstore por vector y medir cuánto tarda."""
+    started = time.perf_counter()
+    timing = {"title": vs['title'], "hits": 0, "seconds": 0.0, "error": None}
+    hits = []
+    try:
+        store = vs['vectorstore']
+        # Chroma retorna distancias (menor es mejor); se convierten a
+        # relevancia según la métrica de la colección
+        metric = (store._collection.metadata or {}).get("hnsw:space", "l2")
+        hits = [
+            (doc, distance_to_relevance(distance, metric))
+            for doc, distance in store.similarity_search_by_vector_with_relevance_scores(
+                vector, k=k, filter=vs.get('filter')
+            )
+        ]
+        timing["hits"] = len(hits)
+    except Exception as e:
+        print(f"Error searching {vs['title']}: {str(e)}")
+        timing["error"] = str(e)
+    timing["seconds"] = time.perf_counter() - started
+    return {"vs": vs, "hits": hits, "timing": timing}
+
+
+def embed_query(vectorstores: List[Dict], query: str) -> Dict[str, List[float]]:
+    """Embeber la consulta una vez por modelo de embeddings (normalmente
+    uno solo, compartido por todos los vectorstores)."""
+    vectors = {}
+    for vs in vectorstores:
+        embeddings = vs['vectorstore'].embeddings
+        model = embedding_model_name(embeddings)
+        if model not in vectors:
+            vectors[model] = query_embedding_cache.embed_query(embeddings, query)
+    return vectors
+
+
+def merge_top_k(searches: List[Dict], k: int) -> List[Dict]:
+    """Top-k global por puntuación, sin repetir textos entre vectorstores."""
+    best: Dict[str, Dict] = {}
+    for search in searches:
+        for doc, score in search["hits"]:
+            content = doc.page_content.strip()
+            key = normalize_chunk_text(content)
+            if key in best and best[key]["score"] >= score:
+                continue
+            best[key] = {
+                "content": content,
+                "source": doc.metadata.get('doc_title', search["vs"]['title']),
+                "score": score,
+                "metadata": doc.metadata
+            }
+    return heapq.nlargest(k, best.values(), key=lambda result: result["score"])
+
+
+def rrf_fuse(rankings: List[List[Dict]], k: int, rrf_k: int = RRF_K) -> List[Dict]:
+    """Reciprocal rank fusion: cada lista suma 1 / (rrf_k + posición) a
+    sus resultados; se retornan los k con mayor suma."""
+    fused: Dict[str, Dict] = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, start=1):
+            key = normalize_chunk_text(result["content"])
+            entry = fused.setdefault(key, {**result, "score": 0.0})
+            entry["score"] += 1.0 / (rrf_k + rank)
+    return heapq.nlargest(k, fused.values(), key=lambda result: result["score"])
+
+
+def _lexical_indexes(vectorstores: List[Dict]) -> List[Dict]:
+    return [entry for vs in vectorstores for entry in vs.get('lexical_indexes', [])]
+
+
+def _search_lexical(indexes: List[Dict], query: str, k: int, exact: bool = False) -> tuple:
+    """BM25 sobre los índices; un error deja la búsqueda solo por vectores."""
+    started = time.perf_counter()
+    try:
+        results = lexical_search(indexes, query, k, exact=exact)
+    except Exception as e:
+        print(f"Error in lexical search: {str(e)}")
+        results = []
+    return results, time.perf_counter() - started
+
+
+def search_vectorstores(vectorstores: List[Dict], query: str, k: int,
+                        mode: str = RETRIEVAL_MODE) -> Dict:
+    """Buscar en todos los vectorstores de un agente.
+
+    Retorna los `results` ordenados por puntuación, los `timings` de
+    cada vectorstore, el tiempo de embeber la consulta y el `mode` usado
+    (vector, hybrid o lexical).
+    """
+    started = time.perf_counter()
+    indexes = _lexical_indexes(vectorstores) if mode == "hybrid" else []
+
+    # Términos exactos: basta BM25 si hay fragmentos que los contienen; si
+    # no, se sigue con la búsqueda híbrida
+    if indexes and is_lexical_query(query):
+        lexical, lexical_seconds = _search_lexical(indexes, query, k, exact=True)
+        if lexical:
+            return {
+                "results": lexical,
+                "timings": [],
+                "embed_seconds": 0.0,
+                "lexical_seconds": lexical_seconds,
+                "mode": "lexical",
+                "seconds": time.perf_counter() - started
+            }
+
+    workers = min(RETRIEVAL_CONCURRENCY, len(vectorstores) + 1)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # BM25 es local: corre mientras se embebe la consulta
+        lexical_future = pool.submit(_search_lexical, indexes, query, k) if indexes else None
+
+        vectors = embed_query(vectorstores, query)
+        embed_seconds = time.perf_counter() - started
+
+        def search_one(vs):
+            vector = vectors[embedding_model_name(vs['vectorstore'].embeddings)]
+            return _search_store(vs, vector, k)
+
+        searches = list(pool.map(search_one, vectorstores))
+        lexical, lexical_seconds = lexical_future.result() if lexical_future else ([], 0.0)
+
+    vector_results = merge_top_k(searches, k)
+    return {
+        "results": rrf_fuse([vector_results, lexical], k) if lexical else vector_results,
+        "timings": [search["timing"] for search in searches],
+        "embed_seconds": embed_seconds,
+        "lexical_seconds": lexical_seconds,
+        "mode": "hybrid" if lexical_future else "vector",
+        "seconds": time.perf_counter() - started
+    }
+
+
+def format_timings(search: Dict) -> List[str]:
+    """Tiempos de una búsqueda, una línea por etapa y vectorstore."""
+    lines = [
+        f"Modo: {search['mode']} ({search['seconds']:.3f} s)",
+        f"Embeber la consulta: {search['embed_seconds']:.3f} s",
+        f"BM25: {search['lexical_seconds']:.3f} s"
+    ]
+    for timing in search['timings']:
+        status = f"error: {timing['error']}" if timing['error'] else f"{timing['hits']} resultados"
+        lines.append(f"{timing['title']}: {timing['seconds']:.3f} s ({status})")
+    return lines
+
+
+def format_results(results: List[Dict]) -> List[str]:
+    """Resultados como líneas `[fuente]: texto` para el modelo."""
+    return [f"[{result['source']}]: {result['content']}" for result in results]
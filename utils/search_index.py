@@ -0,0 +1,281 @@
+# utils/search_index.py
+import re
+import hashlib
+import unicodedata
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Set
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize_text(text) -> str:
+    """Pasar a minúsculas y eliminar acentos (Matemáticas -> matematicas)."""
+    decomposed = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text) -> List[str]:
+    """Dividir un texto normalizado en tokens alfanuméricos."""
+    return TOKEN_PATTERN.findall(normalize_text(text))
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Normalizar espacios para que cambios de formato no invaliden la caché."""
+    return " ".join(text.split())
+
+
+def text_hash(text: str) -> str:
+    """Hash del texto normalizado de un fragmento."""
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()
+
+
+# Campos en los que busca el texto del catálogo (además de las etiquetas)
+SEARCH_FIELDS = ("title", "description", "author")
+
+
+def document_tokens(doc: Dict) -> Set[str]:
+    """Extraer los tokens de los campos buscables de un documento."""
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        tokens.update(tokenize(doc.get(field, '')))
+    for tag in doc.get('tags', []) or []:
+        tokens.update(tokenize(tag))
+    return tokens
+
+
+def sort_value(field: str, doc: Dict):
+    """Valor por el que se ordena un documento en un campo."""
+    value = doc.get(field)
+    if field == "year":
+        try:
+            return int(value or 0)
+        except (ValueError, TypeError):
+            return 0
+    return normalize_text(value or '')
+
+
+class InvertedIndex:
+    """Índice invertido en memoria: token normalizado -> hashes de documentos."""
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        self.doc_tokens: Dict[str, Set[str]] = {}
+        # Vocabulario ordenado para resolver prefijos con búsqueda binaria
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+
+    def add(self, doc_hash: str, doc: Dict) -> None:
+        """Indexar (o reindexar) un documento."""
+        self.remove(doc_hash)
+        tokens = document_tokens(doc)
+        self.doc_tokens[doc_hash] = tokens
+        for token in tokens:
+            if token not in self.postings:
+                self.postings[token] = set()
+                self._vocabulary_dirty = True
+            self.postings[token].add(doc_hash)
+
+    def remove(self, doc_hash: str) -> None:
+        """Eliminar un documento del índice."""
+        for token in self.doc_tokens.pop(doc_hash, ()):
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(doc_hash)
+            if not postings:
+                del self.postings[token]
+                self._vocabulary_dirty = True
+
+    def build(self, metadata: Dict[str, Dict]) -> None:
+        """Reconstruir el índice completo a partir de los metadatos."""
+        self.postings = {}
+        self.doc_tokens = {}
+        for doc_hash, doc in metadata.items():
+            self.add(doc_hash, doc)
+        self._vocabulary_dirty = True
+
+    def _prefix_matches(self, prefix: str) -> Set[str]:
+        """Obtener los documentos con algún token que empiece por el prefijo."""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self.postings)
+            self._vocabulary_dirty = False
+
+        matches = set()
+        position = bisect_left(self._vocabulary, prefix)
+        while position < len(self._vocabulary):
+            token = self._vocabulary[position]
+            if not token.startswith(prefix):
+                break
+            matches.update(self.postings[token])
+            position += 1
+        return matches
+
+    def search(self, query: str, candidates: Optional[Iterable[str]] = None) -> Set[str]:
+        """Buscar documentos que contengan todos los términos de la consulta.
+
+        Cada término se resuelve por prefijo para que la búsqueda funcione
+        mientras el usuario escribe.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return set(candidates) if candidates is not None else set(self.doc_tokens)
+
+        # Resolver primero los términos más largos (más selectivos)
+        result = set(candidates) if candidates is not None else None
+        for term in sorted(set(terms), key=len, reverse=True):
+            matches = self._prefix_matches(term)
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        return result
+
+
+class FacetIndex:
+    """Índices secundarios para los filtros del catálogo.
+
+    Mantiene un conjunto de hashes por valor de cada campo facetado y un
+    arreglo ordenado de años para consultas por rango.
+    """
+
+    FACET_FIELDS = ("category", "type", "level", "language")
+
+    def __init__(self):
+        self.facets: Dict[str, Dict[str, Set[str]]] = {
+            field: {} for field in self.FACET_FIELDS
+        }
+        self.doc_values: Dict[str, Dict] = {}
+        # Arreglos paralelos ordenados por año
+        self._years: List[int] = []
+        self._year_hashes: List[str] = []
+
+    @staticmethod
+    def _parse_year(value) -> int:
+        try:
+            return int(value or 0)
+        except (ValueError, TypeError):
+            return 0
+
+    def add(self, doc_hash: str, doc: Dict) -> None:
+        """Indexar (o reindexar) un documento."""
+        self.remove(doc_hash)
+        values = {field: doc.get(field) for field in self.FACET_FIELDS}
+        values["year"] = self._parse_year(doc.get('year', 0))
+        self.doc_values[doc_hash] = values
+
+        for field in self.FACET_FIELDS:
+            if values[field] is not None:
+                self.facets[field].setdefault(values[field], set()).add(doc_hash)
+
+        position = bisect_left(self._years, values["year"])
+        self._years.insert(position, values["year"])
+        self._year_hashes.insert(position, doc_hash)
+
+    def remove(self, doc_hash: str) -> None:
+        """Eliminar un documento de los índices."""
+        values = self.doc_values.pop(doc_hash, None)
+        if values is None:
+            return
+
+        for field in self.FACET_FIELDS:
+            bucket = self.facets[field].get(values[field])
+            if bucket is not None:
+                bucket.discard(doc_hash)
+                if not bucket:
+                    del self.facets[field][values[field]]
+
+        position = bisect_left(self._years, values["year"])
+        while self._year_hashes[position] != doc_hash:
+            position += 1
+        del self._years[position]
+        del self._year_hashes[position]
+
+    def build(self, metadata: Dict[str, Dict]) -> None:
+        """Reconstruir los índices a partir de los metadatos."""
+        self.facets = {field: {} for field in self.FACET_FIELDS}
+        self.doc_values = {}
+        for doc_hash, doc in metadata.items():
+            values = {field: doc.get(field) for field in self.FACET_FIELDS}
+            values["year"] = self._parse_year(doc.get('year', 0))
+            self.doc_values[doc_hash] = values
+            for field in self.FACET_FIELDS:
+                if values[field] is not None:
+                    self.facets[field].setdefault(values[field], set()).add(doc_hash)
+
+        # Ordenar una sola vez en lugar de insertar documento por documento
+        pairs = sorted(
+            (values["year"], doc_hash) for doc_hash, values in self.doc_values.items()
+        )
+        self._years = [year for year, _ in pairs]
+        self._year_hashes = [doc_hash for _, doc_hash in pairs]
+
+    def lookup(self, field: str, value) -> Set[str]:
+        """Obtener los documentos con un valor concreto en un campo."""
+        return self.facets[field].get(value, set())
+
+    def year_range(self, start: int, end: int) -> Set[str]:
+        """Obtener los documentos publicados entre dos años (inclusive)."""
+        lo = bisect_left(self._years, start)
+        hi = bisect_right(self._years, end)
+        return set(self._year_hashes[lo:hi])
+
+    def counts(self, field: str) -> Dict[str, int]:
+        """Obtener el número de documentos por valor de un campo."""
+        if field == "year":
+            counts: Dict[int, int] = {}
+            for year in self._years:
+                counts[year] = counts.get(year, 0) + 1
+            return counts
+        return {value: len(hashes) for value, hashes in self.facets[field].items()}
+
+
+class SortedIndex:
+    """Índice preordenado por un campo para paginar con cursores."""
+
+    def __init__(self, field: str):
+        self.field = field
+        self._keys: List[tuple] = []
+        self._doc_keys: Dict[str, tuple] = {}
+
+    def add(self, doc_hash: str, doc: Dict) -> None:
+        """Indexar (o reindexar) un documento."""
+        self.remove(doc_hash)
+        key = (sort_value(self.field, doc), doc_hash)
+        self._doc_keys[doc_hash] = key
+        self._keys.insert(bisect_left(self._keys, key), key)
+
+    def remove(self, doc_hash: str) -> None:
+        """Eliminar un documento del índice."""
+        key = self._doc_keys.pop(doc_hash, None)
+        if key is not None:
+            del self._keys[bisect_left(self._keys, key)]
+
+    def build(self, metadata: Dict[str, Dict]) -> None:
+        """Reconstruir el índice a partir de los metadatos."""
+        self._doc_keys = {
+            doc_hash: (sort_value(self.field, doc), doc_hash)
+            for doc_hash, doc in metadata.items()
+        }
+        self._keys = sorted(self._doc_keys.values())
+
+    def key_of(self, doc_hash: str) -> Optional[tuple]:
+        return self._doc_keys.get(doc_hash)
+
+    def page(self, page_size: int, after: Optional[tuple] = None, descending: bool = False,
+             members: Optional[Set[str]] = None) -> List[str]:
+        """Obtener la página de hashes que sigue a la clave `after`.
+
+        Con `members` se pagina solo un subconjunto (p. ej. resultados de
+        búsqueda), ordenando únicamente ese subconjunto.
+        """
+        if members is None:
+            keys = self._keys
+        else:
+            keys = sorted(self._doc_keys[h] for h in members if h in self._doc_keys)
+
+        if descending:
+            end = bisect_left(keys, after) if after is not None else len(keys)
+            start = max(0, end - page_size)
+            return [doc_hash for _, doc_hash in reversed(keys[start:end])]
+
+        start = bisect_right(keys, after) if after is not None else 0
+        return [doc_hash for _, doc_hash in keys[start:start + page_size]]
@@ -0,0 +1,144 @@
+# utils/thumbnails.py
+import os
+import hashlib
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+THUMBNAIL_DIR = os.path.join("data", "thumbnails")
+
+# Ancho en píxeles de cada variante
+THUMBNAIL_SIZES = {
+    "small": 160,
+    "medium": 320,
+    "large": 640
+}
+
+JPEG_QUALITY = 75
+
+# Presupuesto de disco para la caché; se desalojan las menos usadas
+THUMBNAIL_BUDGET_BYTES = int(os.environ.get("YACHANI_THUMBNAIL_BUDGET_MB", 200)) * 1024 * 1024
+
+# Al superar el presupuesto se desaloja hasta esta fracción, así el
+# directorio se recorre solo de vez en cuando
+EVICTION_TARGET = 0.9
+
+# Tamaño de la caché según este proceso (None hasta medirlo)
+_cache_bytes: Optional[int] = None
+_eviction_lock = threading.Lock()
+
+
+def source_key(path: str) -> str:
+    """Clave de un archivo sin content_hash (documentos antiguos): ruta,
+    mtime y tamaño, sin leer el contenido."""
+    stat = os.stat(path)
+    return hashlib.sha256(
+        f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}".encode()
+    ).hexdigest()
+
+
+def _thumbnail_source(doc: Dict) -> Optional[str]:
+    """Elegir el archivo del que se genera la miniatura."""
+    original_path = doc.get('original_path')
+    if original_path and original_path.lower().endswith(".pdf") and os.path.exists(original_path):
+        return original_path
+    preview_path = doc.get('preview_path')
+    if preview_path and os.path.exists(preview_path):
+        return preview_path
+    return None
+
+
+def _render_thumbnail(source_path: str, output_path: str, width: int) -> None:
+    """Renderizar la primera página a un JPEG comprimido del ancho indicado."""
+    document = fitz.open(source_path)
+    try:
+        page = document[0]
+        zoom = width / page.rect.width
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        # Escribir en un temporal para que otra sesión no lea un archivo a medias
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix=".jpg")
+        os.close(fd)
+        pix.save(temp_path, output="jpeg", jpg_quality=JPEG_QUALITY)
+        os.replace(temp_path, output_path)
+    finally:
+        document.close()
+
+
+def _scan_cache() -> Tuple[List[Tuple[float, int, str]], int]:
+    """Miniaturas en disco como (mtime, tamaño, ruta) y su tamaño total."""
+    entries = []
+    total = 0
+    for root, _, files in os.walk(THUMBNAIL_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    return entries, total
+
+
+def _record_thumbnail(size: int) -> None:
+    """Sumar una miniatura nueva al total y, si se pasa del presupuesto,
+    desalojar las usadas hace más tiempo.
+
+    El total lo lleva cada proceso; el recorrido del directorio al
+    desalojar lo corrige con lo que hayan escrito los demás.
+    """
+    global _cache_bytes
+    with _eviction_lock:
+        if _cache_bytes is None:
+            _cache_bytes = _scan_cache()[1]
+        else:
+            _cache_bytes += size
+        if _cache_bytes <= THUMBNAIL_BUDGET_BYTES:
+            return
+
+        entries, total = _scan_cache()
+        target = THUMBNAIL_BUDGET_BYTES * EVICTION_TARGET
+        for _, entry_size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= entry_size
+            except FileNotFoundError:
+                continue
+        _cache_bytes = total
+
+
+def get_thumbnail(doc: Dict, size: str = "medium") -> Optional[str]:
+    """Obtener la ruta de la miniatura de un documento, generándola si falta.
+
+    Las variantes se guardan por hash de contenido, así que documentos
+    idénticos comparten miniaturas (los antiguos sin content_hash, por
+    ruta, mtime y tamaño). Retorna None si no hay vista previa.
+    """
+    if size not in THUMBNAIL_SIZES:
+        raise ValueError(f"Tamaño de miniatura no soportado: {size}")
+
+    source_path = _thumbnail_source(doc)
+    if not source_path:
+        return None
+
+    try:
+        content_hash = doc.get('content_hash') or source_key(source_path)
+        thumbnail_dir = os.path.join(THUMBNAIL_DIR, content_hash[:2])
+        thumbnail_path = os.path.join(thumbnail_dir, f"{content_hash}_{size}.jpg")
+
+        if os.path.exists(thumbnail_path):
+            # Marcar como usada recientemente para el desalojo LRU
+            os.utime(thumbnail_path)
+            return thumbnail_path
+
+        os.makedirs(thumbnail_dir, exist_ok=True)
+        _render_thumbnail(source_path, thumbnail_path, THUMBNAIL_SIZES[size])
+        _record_thumbnail(os.path.getsize(thumbnail_path))
+        return thumbnail_path if os.path.exists(thumbnail_path) else None
+    except Exception as e:
+        print(f"Error creating thumbnail: {str(e)}")
+        return None
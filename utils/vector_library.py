@@ -0,0 +1,216 @@
+# utils/vector_library.py
+"""Colección de vectores compartida por toda la biblioteca.
+
+Cada fragmento se guarda con el `doc_hash` de su documento, así la
+búsqueda de un agente es una sola consulta ANN filtrada por sus
+documentos en lugar de una consulta por vectorstore.
+
+Los directorios de cada documento siguen siendo la fuente de verdad: la
+colección se llena copiando sus vectores, sin volver a embeber.
+
+Migrar la biblioteca existente: python -m utils.vector_library migrate
+"""
+import os
+import sys
+import argparse
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from utils.embedding_backends import (
+    LEGACY_BACKEND, backend_name, get_embeddings, read_backend_marker, verify_backend
+)
+
+VECTOR_LIBRARY_DIR = os.path.join("data", "vector_library")
+VECTOR_LIBRARY_COLLECTION = "yachani_library"
+
+# Escribir también cada documento en la colección compartida y usarla
+# para las búsquedas de los agentes
+VECTOR_LIBRARY_ENABLED = os.environ.get("YACHANI_VECTOR_LIBRARY", "0") == "1"
+
+# Fragmentos copiados por lectura/escritura al importar un documento
+IMPORT_BATCH = 500
+
+
+def _chroma():
+    # Importación diferida: el CLI debe cambiar sqlite3 antes de cargar chromadb
+    from langchain_chroma import Chroma
+    return Chroma
+
+
+def library_collection() -> str:
+    """Nombre de la colección: una por backend de embeddings."""
+    backend = backend_name()
+    if backend == LEGACY_BACKEND:
+        return VECTOR_LIBRARY_COLLECTION
+    return f"{VECTOR_LIBRARY_COLLECTION}_{backend}"
+
+
+def get_library(embeddings: Optional[Embeddings] = None):
+    """Abrir la colección compartida del backend configurado."""
+    return _chroma()(
+        collection_name=library_collection(),
+        persist_directory=VECTOR_LIBRARY_DIR,
+        embedding_function=embeddings or get_embeddings()
+    )
+
+
+def library_id(doc_hash: str, chunk_id: str) -> str:
+    """Id de un fragmento en la colección: el mismo texto puede estar en
+    varios documentos."""
+    return f"{doc_hash}:{chunk_id}"
+
+
+def library_filter(doc_hashes: List[str]) -> Dict:
+    """Filtro `doc_hash IN (...)`.
+
+    Se expresa como `$or` de igualdades, que chromadb 0.4 admite.
+    """
+    if len(doc_hashes) == 1:
+        return {"doc_hash": {"$eq": doc_hashes[0]}}
+    return {"$or": [{"doc_hash": {"$eq": doc_hash}} for doc_hash in doc_hashes]}
+
+
+def in_library(library, doc_hash: str) -> bool:
+    """Retorna True si el documento ya tiene fragmentos en la colección."""
+    found = library._collection.get(where={"doc_hash": {"$eq": doc_hash}}, limit=1, include=[])
+    return bool(found["ids"])
+
+
+def remove_document(library, doc_hash: str) -> None:
+    """Eliminar de la colección los fragmentos de un documento."""
+    library._collection.delete(where={"doc_hash": {"$eq": doc_hash}})
+
+
+def import_document(library, doc: Dict) -> int:
+    """Copiar los vectores del directorio de un documento a la colección.
+
+    Reemplaza lo que hubiera del documento (p. ej. tras reindexarlo) y
+    retorna el número de fragmentos copiados.
+    """
+    verify_backend(doc['vectorstore_path'], library.embeddings)
+    source = _chroma()(persist_directory=doc['vectorstore_path'])
+    remove_document(library, doc['hash'])
+
+    copied = 0
+    while True:
+        batch = source._collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=IMPORT_BATCH,
+            offset=copied
+        )
+        if not batch["ids"]:
+            return copied
+        library._collection.upsert(
+            ids=[library_id(doc['hash'], chunk_id) for chunk_id in batch["ids"]],
+            embeddings=batch["embeddings"],
+            documents=batch["documents"],
+            metadatas=[
+                {**(metadata or {}), "doc_hash": doc['hash'], "doc_title": doc['title']}
+                for metadata in batch["metadatas"]
+            ]
+        )
+        copied += len(batch["ids"])
+
+
+def sync_document(doc: Dict) -> None:
+    """Reflejar un documento recién ingerido en la colección, si está activa."""
+    if not VECTOR_LIBRARY_ENABLED:
+        return
+    try:
+        import_document(get_library(), doc)
+    except Exception as e:
+        print(f"Error syncing {doc.get('title')} to the vector library: {str(e)}")
+
+
+def build_vectorstores(docs: List[Dict], k: int,
+                       embeddings: Optional[Embeddings] = None) -> List[Dict]:
+    """Vectorstores de búsqueda de un agente.
+
+    Con la colección activa y todos los documentos importados retorna una
+    sola entrada con un retriever filtrado por sus `doc_hash`; si no, una
+    entrada por documento como hasta ahora.
+    """
+    embeddings = embeddings or get_embeddings()
+    docs = [doc for doc in docs if doc and os.path.exists(doc.get('vectorstore_path', ''))]
+    if not docs:
+        return []
+    # Un vectorstore de otro backend daría resultados sin sentido
+    for doc in docs:
+        verify_backend(doc['vectorstore_path'], embeddings)
+
+    if VECTOR_LIBRARY_ENABLED:
+        library = get_library(embeddings)
+        where = library_filter([doc['hash'] for doc in docs])
+        if all(in_library(library, doc['hash']) for doc in docs):
+            return [{
+                'hash': None,
+                'title': ", ".join(doc['title'] for doc in docs),
+                'doc_hashes': [doc['hash'] for doc in docs],
+                'vectorstore': library,
+                'filter': where,
+                'retriever': library.as_retriever(search_kwargs={"k": k, "filter": where}),
+                'lexical_indexes': [
+                    {'path': doc['vectorstore_path'], 'title': doc['title']} for doc in docs
+                ]
+            }]
+
+    vectorstores = []
+    for doc in docs:
+        vectorstore = _chroma()(
+            persist_directory=doc['vectorstore_path'],
+            embedding_function=embeddings
+        )
+        vectorstores.append({
+            'hash': doc['hash'],
+            'title': doc['title'],
+            'vectorstore': vectorstore,
+            'retriever': vectorstore.as_retriever(search_kwargs={"k": k}),
+            'lexical_indexes': [{'path': doc['vectorstore_path'], 'title': doc['title']}]
+        })
+    return vectorstores
+
+
+def migrate(force: bool = False) -> Dict:
+    """Importar todos los documentos de la biblioteca a la colección."""
+    from utils.document_manager import get_document_manager
+
+    library = get_library()
+    summary = {"documents": 0, "skipped": 0, "missing": 0, "mismatched": 0, "chunks": 0}
+    for doc in list(get_document_manager().iter_documents()):
+        if not os.path.exists(doc.get('vectorstore_path', '')):
+            summary["missing"] += 1
+            print(f"Missing vectorstore for {doc['title']}")
+        elif read_backend_marker(doc['vectorstore_path'])["backend"] != backend_name():
+            summary["mismatched"] += 1
+            print(f"Skipping {doc['title']}: created with another embedding backend")
+        elif not force and in_library(library, doc['hash']):
+            summary["skipped"] += 1
+        else:
+            copied = import_document(library, doc)
+            summary["documents"] += 1
+            summary["chunks"] += copied
+            print(f"Imported {doc['title']} ({copied} chunks)")
+    return summary
+
+
+if __name__ == "__main__":
+    try:
+        import pysqlite3
+        sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+    except ImportError:
+        pass
+
+    parser = argparse.ArgumentParser(description="Colección de vectores compartida")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="Importar los vectorstores existentes sin volver a embeber"
+    )
+    migrate_parser.add_argument("--force", action="store_true",
+                                help="Reimportar también los documentos ya presentes")
+    args = parser.parse_args()
+
+    summary = migrate(force=args.force)
+    print(f"Imported {summary['documents']} documents ({summary['chunks']} chunks), "
+          f"skipped {summary['skipped']}, missing {summary['missing']}, "
+          f"other backend {summary['mismatched']}")